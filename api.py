@@ -0,0 +1,343 @@
+"""
+Batched JSON forecast API on the dashboard's Flask server.
+
+    POST /api/forecast  {"months": 600, "wells": [{"id": "A", "qi": 350, "di": 0.05, "b": 0.9}, ...]}
+    POST /api/eur       {"q_limit": 5, "t_max": 600, "wells": [...]}
+
+Each well gives ``qi`` (volume/day, positive), ``di`` and optionally
+``dmin`` (nominal per month) and ``b`` directly, all finite and the last
+three non-negative, or a ``history`` of monthly daily rates that is
+cleaned and fit first. Forecasts return Rate (per day) and Cum (volume)
+for months 0..months-1 of the modified hyperbolic; EUR is the closed-form
+volume to ``q_limit`` or ``t_max`` months.
+
+Wells already answered are served from an LRU of per-well results, kept
+as ready-encoded JSON since encoding dominates the cost of a long forecast
+and capped at ``CACHE_BYTES`` as well as ``CACHE_ENTRIES``;
+fits are cached by a hash of the history. The rest go to a micro-batcher: a
+background thread collects the requests that arrive within ``MAX_WAIT``
+seconds of each other and evaluates each kind of query for all of them in
+one call: one vectorized engine call for forecasts and EURs, and one
+cleaning pass and ``fitting.fit_wells`` call for histories.
+"""
+import json
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+
+import cleaning
+import decline
+import fitting
+import metrics
+
+MAX_WELLS = 10000
+MAX_MONTHS = 1200
+MAX_WAIT = 0.002
+MAX_BATCH = 100000
+CACHE_ENTRIES = 4096
+CACHE_BYTES = 64 * 1024 * 1024
+TIMEOUT = 30
+
+
+class RequestError(ValueError):
+    """Malformed request; reported to the client as a 400."""
+
+
+class ResultCache:
+    """
+    Thread-safe LRU of per-well results, evicted oldest-first once either
+    ``max_entries`` or ``max_bytes`` (the summed size of the values) is
+    exceeded.
+    """
+
+    def __init__(self, max_entries=CACHE_ENTRIES, max_bytes=CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= sys.getsizeof(old)
+            self._entries[key] = value
+            self.nbytes += sys.getsizeof(value)
+            while self._entries and (
+                len(self._entries) > self.max_entries or self.nbytes > self.max_bytes
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= sys.getsizeof(evicted)
+
+
+def evaluate(key, params):
+    """
+    One vectorized engine call for ``params`` (n_wells, 4: qi, di, b, dmin).
+
+    ``key`` is ``("forecast", months)`` for an (n, 2, months) array of rate
+    and cumulative, or ``("eur", q_limit, t_max)`` for an (n,) array. For
+    ``("fit",)`` the params are an object array of rate histories and the
+    result an object array of their FitResults.
+    """
+    kind = key[0]
+    with metrics.timer("dca_stage_seconds", f"api_{kind}"):
+        if kind == "fit":
+            # In-process: a pool per batch would fork the web worker and
+            # bypass the capped, niced pool in jobs.py
+            fits = fitting.fit_wells(cleaning.clean(cleaning.pad(params)).rates, processes=1)
+            result = np.empty(len(fits), dtype=object)
+            for i, fit in enumerate(fits):
+                result[i] = fit
+            return result
+        qi, di, b, dmin = params.T
+        if kind == "forecast":
+            t = np.arange(key[1], dtype=float)
+            q = decline.modified_rate(qi, di, b, dmin, t)
+            cum = decline.modified_cum(qi, di, b, dmin, t) * decline.DAYS_PER_MONTH
+            return np.stack([q, cum], axis=1)
+        if kind == "eur":
+            return decline.eur(qi, di, b, dmin, key[1], key[2]) * decline.DAYS_PER_MONTH
+    raise ValueError(f"unknown query {kind!r}")
+
+
+class MicroBatcher:
+    """Coalesces concurrent ``submit`` calls into one ``engine`` call per key."""
+
+    def __init__(self, engine=evaluate, max_wait=MAX_WAIT, max_batch=MAX_BATCH):
+        self.engine = engine
+        self.max_wait = max_wait
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, key, params):
+        """Future for ``engine(key, params)`` evaluated alongside other requests."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="api-batcher", daemon=True)
+                self._thread.start()
+        future = Future()
+        self._queue.put((key, params, future))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        size = len(batch[0][1])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[1])
+        return batch
+
+    def _run(self):
+        while True:
+            groups = {}
+            for key, params, future in self._collect():
+                groups.setdefault(key, []).append((params, future))
+            for key, items in groups.items():
+                try:
+                    result = self.engine(key, np.concatenate([p for p, _ in items]))
+                except Exception as error:
+                    for _, future in items:
+                        future.set_exception(error)
+                    continue
+                offsets = np.cumsum([len(p) for p, _ in items])[:-1]
+                for part, (_, future) in zip(np.split(result, offsets), items):
+                    future.set_result(part)
+
+
+cache = ResultCache()
+batcher = MicroBatcher()
+
+
+def _number(obj, name, default=None):
+    value = obj.get(name, default)
+    if value is None:
+        raise RequestError(f"well is missing {name!r}")
+    if isinstance(value, bool):
+        raise RequestError(f"{name!r} must be a number")
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise RequestError(f"{name!r} must be a number")
+    if not np.isfinite(value):
+        raise RequestError(f"{name!r} must be finite")
+    return value
+
+
+def _positive(obj, name, default=None):
+    value = _number(obj, name, default)
+    if value <= 0:
+        raise RequestError(f"{name!r} must be positive")
+    return value
+
+
+def _non_negative(obj, name, default=None):
+    value = _number(obj, name, default)
+    if value < 0:
+        raise RequestError(f"{name!r} must not be negative")
+    return value
+
+
+def _history(well):
+    """Daily rates of a well's ``history``; null months are missing."""
+    history = well["history"]
+    if not isinstance(history, list) or not history:
+        raise RequestError("'history' must be a non-empty list of numbers")
+    try:
+        rates = np.array([np.nan if v is None else v for v in history], dtype=float)
+    except (TypeError, ValueError):
+        raise RequestError("'history' must be a list of numbers")
+    if rates.ndim != 1:
+        raise RequestError("'history' must be a list of numbers")
+    if np.isinf(rates).any():
+        raise RequestError("'history' must be a list of finite numbers")
+    return rates
+
+
+def well_params(wells):
+    """
+    (n_wells, 4) array of qi, di, b and dmin for the request wells. Wells
+    given by history are fit, all the uncached ones in one batched call.
+    """
+    params = np.empty((len(wells), 4))
+    pending = {}
+    for i, well in enumerate(wells):
+        if not isinstance(well, dict):
+            raise RequestError("each well must be an object")
+        params[i, 3] = _non_negative(well, "dmin", 0.0)
+        if "history" not in well:
+            params[i, :3] = _positive(well, "qi"), _non_negative(well, "di"), _non_negative(well, "b", 0.0)
+            continue
+        rates = _history(well)
+        key = ("fit", fitting.history_hash(rates))
+        pending.setdefault(key, (rates, []))[1].append(i)
+
+    fits = {key: cache.get(key) for key in pending}
+    missing = [key for key, fit in fits.items() if fit is None]
+    if missing:
+        histories = np.empty(len(missing), dtype=object)
+        for j, key in enumerate(missing):
+            histories[j] = pending[key][0]
+        computed = batcher.submit(("fit",), histories).result(timeout=TIMEOUT)
+        for key, fit in zip(missing, computed):
+            fits[key] = fit
+            cache.put(key, fit)
+
+    for key, (_, rows) in pending.items():
+        fit = fits[key]
+        if not fit.success:
+            raise RequestError(f"could not fit history of well {wells[rows[0]].get('id')!r}")
+        params[rows, :3] = fit.qi, fit.di, fit.b
+    return params
+
+
+def query(key, wells, encode):
+    """
+    Per-well JSON fragments for ``key``, from the cache or one batched
+    engine call whose rows are turned into fragments by ``encode``.
+    """
+    if not isinstance(wells, list) or not wells:
+        raise RequestError("'wells' must be a non-empty list")
+    if len(wells) > MAX_WELLS:
+        raise RequestError(f"at most {MAX_WELLS} wells per request")
+    params = well_params(wells)
+    results = [cache.get(key + tuple(p)) for p in params]
+    missing = [i for i, r in enumerate(results) if r is None]
+    if missing:
+        computed = batcher.submit(key, params[missing]).result(timeout=TIMEOUT)
+        for i, value in zip(missing, computed):
+            results[i] = encode(value)
+            cache.put(key + tuple(params[i]), results[i])
+    return params, results
+
+
+def _json_list(values):
+    """Plain floats for JSON, with NaN and inf as null."""
+    values = np.asarray(values, dtype=float)
+    if np.isfinite(values).all():
+        return values.tolist()
+    return np.where(np.isfinite(values), values, None).tolist()
+
+
+def _dumps(obj):
+    return json.dumps(obj, separators=(",", ":"))
+
+
+def _response(wells, params, fragments):
+    rows = []
+    for well, p, fragment in zip(wells, params, fragments):
+        head = _dumps({"id": well.get("id"), "qi": p[0], "di": p[1], "b": p[2], "dmin": p[3]})
+        rows.append(f"{head[:-1]},{fragment}}}")
+    return '{"wells":[' + ",".join(rows) + "]}"
+
+
+def forecast(body):
+    """JSON text of monthly rate and cumulative for every well in ``body``."""
+    months = int(_number(body, "months", 600))
+    if not 0 < months <= MAX_MONTHS:
+        raise RequestError(f"'months' must be between 1 and {MAX_MONTHS}")
+    wells = body.get("wells")
+    params, fragments = query(
+        ("forecast", months), wells,
+        lambda r: _dumps({"rate": _json_list(r[0]), "cum": _json_list(r[1])})[1:-1],
+    )
+    return _response(wells, params, fragments)
+
+
+def eur(body):
+    """JSON text of the EUR of every well in ``body``."""
+    q_limit = _non_negative(body, "q_limit", 0.0)
+    t_max = _positive(body, "t_max", MAX_MONTHS)
+    wells = body.get("wells")
+    params, fragments = query(
+        ("eur", q_limit, t_max), wells,
+        lambda r: _dumps({"eur": _json_list([r])[0]})[1:-1],
+    )
+    return _response(wells, params, fragments)
+
+
+def register(server, prefix="/api"):
+    """Add the forecast and EUR endpoints to a Flask ``server``."""
+    from flask import Response, jsonify, request
+
+    def endpoint(handler):
+        def view():
+            body = request.get_json(silent=True)
+            if not isinstance(body, dict):
+                return jsonify(error="request body must be a JSON object"), 400
+            try:
+                return Response(handler(body), mimetype="application/json")
+            except RequestError as error:
+                return jsonify(error=str(error)), 400
+        view.__name__ = f"api_{handler.__name__}"
+        return view
+
+    server.add_url_rule(f"{prefix}/forecast", view_func=endpoint(forecast), methods=["POST"])
+    server.add_url_rule(f"{prefix}/eur", view_func=endpoint(eur), methods=["POST"])
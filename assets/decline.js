@@ -0,0 +1,134 @@
+/*
+ * Client-side Arps forecast, mirroring decline.py, so parameter edits
+ * redraw the curve without a round trip to the server.
+ */
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    decline: {
+        DAYS_PER_MONTH: 30.437,
+        STEP: 0.5,
+        // Same as decimate.WEBGL_THRESHOLD and decimate.DEFAULT_WIDTH
+        WEBGL_THRESHOLD: 1000,
+        DEFAULT_WIDTH: 1000,
+
+        declineName: function (b) {
+            if (b === 0) {
+                return "Exponential";
+            }
+            if (b === 1) {
+                return "Harmonic";
+            }
+            if (b > 0) {
+                return "Hyperbolic";
+            }
+            return "Invalid b-value";
+        },
+
+        // Rate and cumulative at times t; same branches as decline.arps
+        arps: function (qi, di, b, t) {
+            const n = t.length;
+            const q = new Array(n);
+            const Np = new Array(n);
+            for (let i = 0; i < n; i++) {
+                if (!(b >= 0)) {
+                    q[i] = NaN;
+                    Np[i] = NaN;
+                } else if (di === 0) {
+                    q[i] = qi;
+                    Np[i] = qi * t[i];
+                } else if (b === 0) {
+                    q[i] = qi * Math.exp(-di * t[i]);
+                    Np[i] = (qi - q[i]) / di;
+                } else if (b === 1) {
+                    q[i] = qi / (1 + di * t[i]);
+                    Np[i] = (qi / di) * Math.log1p(di * t[i]);
+                } else {
+                    q[i] = qi * Math.pow(1 + b * di * t[i], -1 / b);
+                    Np[i] = (Math.pow(qi, b) / ((1 - b) * di)) *
+                        (Math.pow(qi, 1 - b) - Math.pow(q[i], 1 - b));
+                }
+            }
+            return [q, Np];
+        },
+
+        // Forecast times: the dashboard's half-month grid, cut to the visible
+        // range when zoomed, or about one point per pixel across the visible
+        // range when the half-month grid would be denser than the plot
+        grid: function (tTot, t0, view) {
+            const ns = window.dash_clientside.decline;
+            let lo = 0.001;
+            let hi = tTot;
+            if (view && view.x0 != null) {
+                lo = Math.max(lo, view.x0 - t0 - ns.STEP);
+                hi = Math.min(hi, view.x1 - t0 + ns.STEP);
+            }
+            const width = (view && view.width) || ns.DEFAULT_WIDTH;
+            const full = Math.max(0, Math.ceil((hi - lo) / ns.STEP));
+            const t = [];
+            if (tTot / ns.STEP <= width) {
+                lo = 0.001;
+                hi = tTot;
+            }
+            if (full <= width) {
+                const first = Math.max(0, Math.floor((lo - 0.001) / ns.STEP));
+                for (let i = first; 0.001 + i * ns.STEP < hi; i++) {
+                    t.push(0.001 + i * ns.STEP);
+                }
+            } else {
+                const step = (hi - lo) / (width - 1);
+                for (let i = 0; i < width; i++) {
+                    t.push(lo + i * step);
+                }
+            }
+            return {t: t, full: full};
+        },
+
+        view: function (relayout) {
+            const graph = document.getElementById("fig");
+            const view = {width: graph && graph.offsetWidth ? graph.offsetWidth : null};
+            if (relayout && relayout["xaxis.range[0]"] !== undefined) {
+                view.x0 = relayout["xaxis.range[0]"];
+                view.x1 = relayout["xaxis.range[1]"];
+            } else if (relayout && relayout["xaxis.range"]) {
+                view.x0 = relayout["xaxis.range"][0];
+                view.x1 = relayout["xaxis.range"][1];
+            } else if (relayout && !relayout["xaxis.autorange"] && !relayout.autosize) {
+                // Legend clicks, y-only zooms and the like keep the current view
+                return window.dash_clientside.no_update;
+            }
+            return view;
+        },
+
+        forecast: function (q_init, q_next, t_months, t_tot, t_init, b_value, fit, view, figure) {
+            const ns = window.dash_clientside.decline;
+            let qi = parseInt(q_init, 10);
+            let t0 = parseFloat(t_init);
+            let b = parseFloat(b_value);
+            let di = Math.log(qi / (parseInt(q_next, 10) / ns.DAYS_PER_MONTH)) / parseInt(t_months, 10);
+            const tTot = parseInt(t_tot, 10);
+            if (fit) {
+                qi = fit.qi;
+                di = fit.di;
+                b = fit.b;
+                t0 = fit.t0;
+            }
+            if (!figure || [qi, t0, b, di, tTot].some(Number.isNaN)) {
+                return window.dash_clientside.no_update;
+            }
+
+            const grid = ns.grid(tTot, t0, view);
+            const t = grid.t;
+            const type = grid.full > ns.WEBGL_THRESHOLD ? "scattergl" : "scatter";
+            const [q, Np] = ns.arps(qi, di, b, t);
+            const x = t.map(function (ti) { return ti + t0; });
+
+            // Traces 0 and 1 are RATE_TRACE and CUM_TRACE in dashboard.py
+            const data = figure.data.slice();
+            data[0] = Object.assign({}, data[0], {type: type, x: x, y: q});
+            data[1] = Object.assign({}, data[1], {type: type, x: x, y: Np});
+            const layout = Object.assign({}, figure.layout, {
+                title: Object.assign({}, figure.layout.title, {text: ns.declineName(b) + " Decline Curve"})
+            });
+            return Object.assign({}, figure, {data: data, layout: layout});
+        }
+    }
+});
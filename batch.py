@@ -0,0 +1,288 @@
+"""
+Headless batch forecasting for a directory of per-well CSVs.
+
+    python batch.py WELL_DIR OUT_DIR [--format parquet] [--workers 8]
+
+Every ``<API>.csv`` in WELL_DIR (Month,Oil,Gas,Water monthly volumes, like
+the bundled samples), or every well of a columnar store when WELL_DIR is
+one (see columnar.py), is fit and forecast on a process pool. Wells are
+handled in chunks; each chunk writes ``forecast-NNNNN.<fmt>`` and
+``fits-NNNNN.csv`` to OUT_DIR and is then recorded in ``checkpoint.txt``.
+A well that cannot be read or fit is recorded as failed, with the error in
+the Error column of its fits part, and the run carries on.
+Re-running the same command skips wells from completed chunks, so an
+interrupted run picks up where it stopped. Each fit is stored with a hash of
+the history and settings it was fit to and a stamp of its source file, so
+refit.py can later update the same parts in place, and, when the source has
+``MM/YYYY`` months, with the ``YYYY-MM`` of its last producing month in the
+LastMonth column, which export.py dates ARIES rows from.
+
+Forecast rows are API, Month (index into the well's history), Rate (per day)
+and Cum (volume since the start of the forecast).
+"""
+import argparse
+import hashlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import cleaning
+import columnar
+import decline
+import fitting
+import loader
+
+CHECKPOINT = "checkpoint.txt"
+
+
+def list_wells(well_dir):
+    """``(api, source)`` for every well in a CSV directory or columnar store, by API."""
+    if columnar.is_store(well_dir):
+        return [(api, api) for api in columnar.open_store(well_dir)]
+    return [(loader.api_from_path(p), p) for p in loader.list_csvs(well_dir)]
+
+
+def read_well(well_dir, source):
+    """
+    Raw daily rates of a ``source`` from ``list_wells`` and its month
+    offsets and first calendar month (see ``columnar.month_offsets``).
+    """
+    if columnar.is_store(well_dir):
+        store = columnar.open_store(well_dir)
+        return store.well(source), store.months(source)
+    df = loader.read_frame(source)
+    months = df["Month"] if "Month" in df.columns else range(len(df))
+    return loader.well_from_frame(df, loader.api_from_path(source)), columnar.month_offsets(months)
+
+
+def load_well(well_dir, source, clean=True):
+    """Daily rates for a ``source`` from ``list_wells``, cleaned unless ``clean`` is False."""
+    well, _ = read_well(well_dir, source)
+    return cleaning.clean_well(well) if clean else well
+
+
+def last_month(months, t_last):
+    """
+    ``YYYY-MM`` of month index ``t_last`` given the ``months`` of
+    ``read_well``; empty when the source is undated or nothing was produced.
+    """
+    offsets, start = months
+    if start < 0 or t_last < 0:
+        return ""
+    year, month = divmod(start + int(offsets[t_last]), 12)
+    return f"{year:04d}-{month + 1:02d}"
+
+
+def settings_key(phase, **fit_kwargs):
+    """Short digest of the phase and fit settings, part of every source stamp."""
+    text = repr((phase, sorted(fit_kwargs.items())))
+    return hashlib.blake2b(text.encode(), digest_size=4).hexdigest()
+
+
+def source_stamp(well_dir, source, settings):
+    """
+    Fit settings plus size and mtime of a CSV source; None for columnar
+    stores, which are cheap to re-read and hash.
+    """
+    if columnar.is_store(well_dir):
+        return None
+    st = os.stat(source)
+    return f"{settings}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def fit_well(well_dir, source, phase="Oil", previous=None, **kwargs):
+    """
+    Load one well and fit ``phase``; returns ``(api, digest, FitResult,
+    last_month)`` where ``last_month`` dates the fit's ``t_last``.
+
+    ``previous`` is the digest and fit of an earlier run (see refit.py): the
+    fit is None when the history still hashes to that digest, and otherwise
+    starts from the earlier parameters.
+    """
+    well, months = read_well(well_dir, source)
+    rates = cleaning.clean_well(well).phases().get(phase)
+    if rates is None:
+        return well.api, None, fitting.FAILED, ""
+    digest = fitting.history_hash(rates, phase=phase, **kwargs)
+    if previous is None:
+        fit = fitting.fit_arps(rates, **kwargs)
+    elif previous[0] == digest:
+        return well.api, digest, None, last_month(months, previous[1].t_last)
+    else:
+        x0 = (previous[1].qi, previous[1].di, previous[1].b) if previous[1].success else None
+        fit = fitting.fit_arps(rates, x0=x0, **kwargs)
+    return well.api, digest, fit, last_month(months, fit.t_last)
+
+
+def fit_job(args):
+    """
+    ``(api, digest, FitResult, last_month, error)``; a well that cannot be
+    loaded or fit is FAILED with the error.
+    """
+    api, well_dir, source, phase, previous, kwargs = args
+    try:
+        _, digest, fit, last = fit_well(well_dir, source, phase, previous, **kwargs)
+    except Exception as error:
+        return api, None, fitting.FAILED, "", f"{type(error).__name__}: {error}"
+    return api, digest, fit, last, ""
+
+
+def forecast_frame(apis, fits, months):
+    """Long-format monthly forecast for successfully fit wells."""
+    ok = [i for i, f in enumerate(fits) if f.success]
+    if not ok:
+        return pd.DataFrame({"API": [], "Month": [], "Rate": [], "Cum": []})
+    qi = np.array([fits[i].qi for i in ok])
+    di = np.array([fits[i].di for i in ok])
+    b = np.array([fits[i].b for i in ok])
+    t0 = np.array([fits[i].t0 for i in ok])
+    t = np.arange(months, dtype=float)
+    q, Np = decline.arps(qi, di, b, t)
+    return pd.DataFrame({
+        "API": np.repeat([apis[i] for i in ok], months),
+        "Month": (t0[:, np.newaxis] + t).ravel(),
+        "Rate": q.ravel(),
+        "Cum": Np.ravel() * decline.DAYS_PER_MONTH,
+    })
+
+
+def fits_frame(apis, fits, **columns):
+    """Fits table; ``columns`` (Hash, Stamp, Error, ...) are added after the fit fields."""
+    df = pd.DataFrame(fits, columns=fitting.FitResult._fields)
+    df.insert(0, "API", apis)
+    for name, values in columns.items():
+        df[name] = values
+    return df
+
+
+def write_frame(df, path, fmt):
+    """Write ``df`` to ``path`` via a temporary file so parts are all-or-nothing."""
+    tmp = path + ".tmp"
+    if fmt == "parquet":
+        try:
+            df.to_parquet(tmp, index=False)
+        except ImportError:
+            sys.exit("Parquet output requires pyarrow: pip install pyarrow")
+    else:
+        df.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+class Checkpoint:
+    """Completed chunk ids in OUT_DIR/checkpoint.txt and the wells they cover."""
+
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        self.path = os.path.join(out_dir, CHECKPOINT)
+        self.chunks = set()
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.chunks = {int(line) for line in f if line.strip()}
+
+    def done_apis(self):
+        done = set()
+        for chunk in self.chunks:
+            fits = pd.read_csv(self.part(chunk, "fits", "csv"), usecols=["API"], dtype=str)
+            done.update(fits["API"])
+        return done
+
+    def next_chunk(self):
+        return max(self.chunks, default=-1) + 1
+
+    def part(self, chunk, kind, fmt):
+        return os.path.join(self.out_dir, f"{kind}-{chunk:05d}.{fmt}")
+
+    def remove_orphans(self):
+        """Delete parts left by a chunk that was interrupted before it was recorded."""
+        for name in os.listdir(self.out_dir):
+            stem, _, _ = name.partition(".")
+            kind, _, chunk = stem.partition("-")
+            if kind in ("forecast", "fits") and chunk.isdigit() and int(chunk) not in self.chunks:
+                os.remove(os.path.join(self.out_dir, name))
+
+    def record(self, chunk):
+        with open(self.path, "a") as f:
+            f.write(f"{chunk}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.chunks.add(chunk)
+
+
+def report(done, total, skipped, started, out=sys.stderr):
+    """Progress line; throughput only counts wells processed by this run."""
+    elapsed = time.monotonic() - started
+    rate = (done - skipped) / elapsed if elapsed else 0.0
+    eta = f"{(total - done) / rate:.0f}s" if rate else "?"
+    pct = 100.0 * done / total if total else 100.0
+    print(f"{done}/{total} wells ({pct:.1f}%), {rate:.0f} wells/s, ETA {eta}", file=out, flush=True)
+
+
+def run(well_dir, out_dir, fmt="csv", phase="Oil", months=600, workers=None,
+        chunk_size=1000, **fit_kwargs):
+    """Fit and forecast every well in ``well_dir``, resuming from ``out_dir``."""
+    workers = workers or os.cpu_count()
+    os.makedirs(out_dir, exist_ok=True)
+    checkpoint = Checkpoint(out_dir)
+    checkpoint.remove_orphans()
+    done = checkpoint.done_apis()
+    sources = [(api, source) for api, source in list_wells(well_dir) if api not in done]
+    total = len(sources) + len(done)
+    chunk = checkpoint.next_chunk()
+    finished = len(done)
+    started = time.monotonic()
+    report(finished, total, len(done), started)
+    settings = settings_key(phase, **fit_kwargs)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for start in range(0, len(sources), chunk_size):
+            wells = sources[start:start + chunk_size]
+            stamps = [source_stamp(well_dir, s, settings) for _, s in wells]
+            jobs = [(api, well_dir, s, phase, None, fit_kwargs) for api, s in wells]
+            results = list(pool.map(fit_job, jobs, chunksize=max(1, len(jobs) // (4 * workers))))
+            apis, digests, fits, lasts, errors = map(list, zip(*results))
+            for api, error in zip(apis, errors):
+                if error:
+                    print(f"{api}: {error}", file=sys.stderr)
+
+            write_frame(forecast_frame(apis, fits, months), checkpoint.part(chunk, "forecast", fmt), fmt)
+            fits_part = fits_frame(apis, fits, LastMonth=lasts, Hash=digests, Stamp=stamps, Error=errors)
+            write_frame(fits_part, checkpoint.part(chunk, "fits", "csv"), "csv")
+            checkpoint.record(chunk)
+            chunk += 1
+            finished += len(jobs)
+            report(finished, total, len(done), started)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit and forecast a directory of per-well CSVs.")
+    parser.add_argument("well_dir", help="directory of <API>.csv production files, or a columnar store")
+    parser.add_argument("out_dir", help="directory for forecast parts and the checkpoint")
+    parser.add_argument("--format", choices=("csv", "parquet"), default="csv")
+    parser.add_argument("--phase", choices=loader.PHASES, default="Oil")
+    parser.add_argument("--months", type=int, default=600, help="forecast length in months")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="wells per output part")
+    parser.add_argument("--b-min", type=float, default=fitting.B_BOUNDS[0])
+    parser.add_argument("--b-max", type=float, default=fitting.B_BOUNDS[1])
+    parser.add_argument("--no-peak-align", action="store_true", help="fit from first production instead of peak month")
+    args = parser.parse_args(argv)
+
+    run(
+        args.well_dir,
+        args.out_dir,
+        fmt=args.format,
+        phase=args.phase,
+        months=args.months,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        b_bounds=(args.b_min, args.b_max),
+        align_peak=not args.no_peak_align,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Benchmarks for the decline, ingest and figure-building hot paths.
+
+    python bench.py                    # run, write bench_results.json, compare
+    python bench.py --save-baseline    # run and make this the new baseline
+    python bench.py arps figure        # only benchmarks whose name starts so
+
+Each benchmark is timed with ``timeit`` (best of several repeats, per call)
+and compared against ``bench_baseline.json``; anything slower than the
+baseline by more than ``--threshold`` is flagged and makes the exit status
+non-zero. Everything runs offline: the sample wells ship with the repo and
+the large inputs are synthesized into a temporary directory.
+
+Baselines are only comparable on the machine that recorded them, so the
+baseline is not part of the repository: record one locally with
+``--save-baseline`` on an unchanged checkout before making changes.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import timeit
+
+import numpy as np
+import pandas as pd
+import plotly
+from dash import Patch
+
+import dashboard
+import decline
+import loader
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE = os.path.join(HERE, "bench_baseline.json")
+RESULTS = os.path.join(HERE, "bench_results.json")
+THRESHOLD = 1.25
+REPEAT = 5
+MONTHS = 120
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """
+    Register a setup function. It is called with a scratch directory and
+    returns the zero-argument callable to time.
+    """
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def well_params(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(50, 500, n), rng.uniform(0.01, 0.2, n), rng.uniform(0, 1.5, n)
+
+
+def synthetic_csvs(directory, n_wells, months, seed=0):
+    """Write ``n_wells`` decline-shaped well CSVs of ``months`` rows each."""
+    rng = np.random.default_rng(seed)
+    qi, di, b = well_params(n_wells, seed)
+    q = decline.arps_rate(qi, di, b, np.arange(months)) * decline.DAYS_PER_MONTH
+    paths = []
+    for i in range(n_wells):
+        noise = rng.lognormal(0, 0.1, (3, months))
+        df = pd.DataFrame({
+            "Month": np.arange(1, months + 1),
+            "Oil": q[i] * noise[0],
+            "Gas": 1.5 * q[i] * noise[1],
+            "Water": 0.5 * q[i] * noise[2],
+        }).round(2)
+        path = os.path.join(directory, f"99-000-{i:05d}-0000.csv")
+        df.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def serialize(obj):
+    return json.dumps(obj, cls=plotly.utils.PlotlyJSONEncoder)
+
+
+for n, label in ((1, "1"), (1000, "1k"), (100000, "100k")):
+    @benchmark(f"arps/{label}")
+    def _arps(tmp, n=n):
+        qi, di, b = well_params(n)
+        t = np.arange(MONTHS) + 0.5
+        return lambda: decline.arps(qi, di, b, t)
+
+
+@benchmark("eur/100k")
+def _eur(tmp):
+    qi, di, b = well_params(100000)
+    return lambda: decline.eur(qi, di, b, 0.005, 1.0)
+
+
+@benchmark("ingest/samples")
+def _ingest_samples(tmp):
+    paths = [os.path.join(HERE, f"{api}.csv") for api in dashboard.REGISTRY]
+    return lambda: [loader.parse_csv(p) for p in paths]
+
+
+@benchmark("ingest/synthetic")
+def _ingest_synthetic(tmp):
+    paths = synthetic_csvs(tmp, 200, 600)
+    return lambda: [loader.parse_csv(p) for p in paths]
+
+
+@benchmark("figure/base")
+def _figure_base(tmp):
+    return lambda: dashboard.base_figure().to_json()
+
+
+@benchmark("figure/sample")
+def _figure_sample(tmp):
+    api = "42-337-34517-0000"
+    well = loader.parse_csv(os.path.join(HERE, f"{api}.csv"))
+    phases = dashboard.REGISTRY.get(api).phases
+
+    def run():
+        patch = Patch()
+        dashboard.patch_production_traces(patch, dashboard.SAMPLE_TRACES, well, phases)
+        return serialize(patch.to_plotly_json())
+    return run
+
+
+@benchmark("figure/long")
+def _figure_long(tmp):
+    # A history far longer than the plot is wide, so decimation does the work
+    t = np.arange(200000)
+    oil = decline.arps_rate(300, 1e-4, 0.9, t)[0] * np.random.default_rng(0).lognormal(0, 0.1, t.size)
+    well = loader.WellData("long", oil=oil)
+
+    def run():
+        patch = Patch()
+        dashboard.patch_production_traces(patch, dashboard.SAMPLE_TRACES, well, ("Oil",))
+        return serialize(patch.to_plotly_json())
+    return run
+
+
+def measure(fn, repeat=REPEAT):
+    """Best time per call in seconds."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def run(names, tmp):
+    results = {}
+    for name in names:
+        results[name] = measure(BENCHMARKS[name](tmp))
+        print(f"{name:<20} {results[name] * 1e3:12.3f} ms", file=sys.stderr)
+    return results
+
+
+def machine():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def write(path, results):
+    with open(path, "w") as f:
+        json.dump({"machine": machine(), "results": results}, f, indent=2)
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """Names of benchmarks slower than ``threshold`` times their baseline."""
+    slow = []
+    print(f"\n{'benchmark':<20} {'baseline ms':>12} {'now ms':>12} {'ratio':>7}")
+    for name, now in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:<20} {'-':>12} {now * 1e3:12.3f} {'new':>7}")
+            continue
+        ratio = now / before
+        flag = "  SLOWER" if ratio > threshold else ""
+        print(f"{name:<20} {before * 1e3:12.3f} {now * 1e3:12.3f} {ratio:7.2f}{flag}")
+        if ratio > threshold:
+            slow.append(name)
+    return slow
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the hot paths and compare against a baseline.")
+    parser.add_argument("only", nargs="*", help="benchmark name prefixes to run (default: all)")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--out", default=RESULTS)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="flag benchmarks slower than this multiple of the baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    args = parser.parse_args(argv)
+
+    names = [n for n in BENCHMARKS if not args.only or any(n.startswith(p) for p in args.only)]
+    with tempfile.TemporaryDirectory() as tmp:
+        results = run(names, tmp)
+    write(args.out, results)
+
+    if args.save_baseline:
+        write(args.baseline, results)
+        print(f"baseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --save-baseline to record one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    slow = compare(results, baseline, args.threshold)
+    if slow:
+        print(f"\n{len(slow)} benchmark(s) slower than {args.threshold:.2f}x baseline: {', '.join(slow)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
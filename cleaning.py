@@ -0,0 +1,191 @@
+"""
+Production data cleaning between ingest and the decline engine.
+
+Histories are cleaned as one NaN-padded (n_wells, n_months) matrix of daily
+rates. Each month gets a bit mask of what was found:
+
+* ``MISSING``: no value reported (NaN, or ``-`` in the source file)
+* ``SHUT_IN``: zero or negative rate
+* ``OUTLIER``: more than ``threshold`` robust standard deviations from the
+  rolling median in log-rate space (a Hampel filter over ``window`` months)
+* ``PRE_PEAK``: before the peak month, where decline starts
+
+Flagged months other than ``PRE_PEAK`` are then left as NaN, interpolated
+in log space between their neighbours, or dropped (closing the gap), and
+the cleaned matrix goes on to the fitter. Rolling windows are sorted with
+a small sorting network of elementwise min/max over shifted copies of the
+matrix, so cleaning a large portfolio is a few dozen whole-array passes
+rather than a loop over wells or windows.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+import loader
+
+MISSING = 1
+SHUT_IN = 2
+OUTLIER = 4
+PRE_PEAK = 8
+
+WINDOW = 7
+THRESHOLD = 3.5
+MIN_MAD = 0.05  # log units, so a very smooth history does not flag noise
+MIN_POINTS = 3
+FILLS = ("nan", "interpolate", "drop")
+BLOCK_CELLS = 1 << 14  # months per block of wells, so the window arrays stay in cache
+
+Cleaned = namedtuple("Cleaned", "rates flags peak")
+Cleaned.__doc__ = """\
+``rates`` is the cleaned matrix, ``flags`` the per-month bit mask (uint8)
+and ``peak`` the month index where decline starts (-1 for empty rows)."""
+
+
+def pad(histories):
+    """Stack 1-D rate series into a NaN-padded float matrix."""
+    histories = [np.asarray(h, dtype=float) for h in histories]
+    lengths = np.array([h.size for h in histories], dtype=int)
+    matrix = np.full((len(histories), lengths.max(initial=0)), np.nan)
+    mask = np.arange(matrix.shape[1]) < lengths[:, np.newaxis]
+    if histories:
+        matrix[mask] = np.concatenate(histories)
+    return matrix
+
+
+def _sort_windows(columns):
+    """
+    Sort a list of equally shaped arrays elementwise (odd-even transposition
+    network), so window k of every position is sorted in whole-array passes.
+    NaNs must already be +inf so they sort last.
+    """
+    columns = list(columns)
+    n = len(columns)
+    for rnd in range(n):
+        for i in range(rnd % 2, n - 1, 2):
+            a, b = columns[i], columns[i + 1]
+            columns[i], columns[i + 1] = np.minimum(a, b), np.maximum(a, b)
+    return np.stack(columns)
+
+
+def _window_median(windows, count):
+    """Median over axis 0 of sorted windows holding ``count`` finite values each."""
+    lo = np.maximum((count - 1) // 2, 0)[np.newaxis]
+    hi = np.maximum(count // 2, 0)[np.newaxis]
+    median = 0.5 * (np.take_along_axis(windows, lo, 0) + np.take_along_axis(windows, hi, 0))[0]
+    median[count == 0] = np.nan
+    return median
+
+
+def rolling_median_mad(values, window=WINDOW):
+    """
+    Centered rolling median and median absolute deviation of each row,
+    ignoring NaNs, plus the number of finite values in each window.
+    """
+    half = window // 2
+    n = values.shape[1]
+    median = np.empty(values.shape)
+    mad = np.empty(values.shape)
+    count = np.empty(values.shape, dtype=int)
+    block_rows = max(1, BLOCK_CELLS // max(n, 1))
+    for start in range(0, values.shape[0], block_rows):
+        block = values[start:start + block_rows]
+        padded = np.pad(block, ((0, 0), (half, window - 1 - half)), constant_values=np.inf)
+        padded[np.isnan(padded)] = np.inf
+        shifted = [padded[:, k:k + n] for k in range(window)]
+        windows = _sort_windows(shifted)
+        n_finite = np.isfinite(windows).sum(axis=0)
+        med = _window_median(windows, n_finite)
+        with np.errstate(invalid="ignore"):
+            deviations = _sort_windows(np.abs(col - med) for col in shifted)
+        rows = slice(start, start + block_rows)
+        median[rows] = med
+        mad[rows] = _window_median(deviations, n_finite)
+        count[rows] = n_finite
+    return median, mad, count
+
+
+def find_peak(rates):
+    """Month of the highest finite rate in each row, -1 where a row has none."""
+    finite = np.isfinite(rates)
+    peak = np.argmax(np.where(finite, rates, -np.inf), axis=1)
+    peak[~finite.any(axis=1)] = -1
+    return peak
+
+
+def fill_gaps(rates, bad, how="nan"):
+    """
+    Replace ``bad`` months: ``"nan"`` blanks them, ``"interpolate"`` fills
+    interior gaps log-linearly (leading and trailing gaps stay NaN) and
+    ``"drop"`` shifts the remaining months left so each row is contiguous.
+    """
+    if how not in FILLS:
+        raise ValueError(f"fill must be one of {', '.join(FILLS)}, not {how!r}")
+    out = np.where(bad, np.nan, rates)
+    if how == "drop":
+        order = np.argsort(bad | np.isnan(out), axis=1, kind="stable")
+        return np.take_along_axis(out, order, axis=1)
+    if how == "interpolate":
+        valid = ~np.isnan(out)
+        n = out.shape[1]
+        idx = np.arange(n)
+        prev = np.maximum.accumulate(np.where(valid, idx, -1), axis=1)
+        nxt = n - 1 - np.maximum.accumulate(np.where(valid, n - 1 - idx, -1)[:, ::-1], axis=1)[:, ::-1]
+        gap = ~valid & (prev >= 0) & (nxt < n)
+        rows, cols = np.nonzero(gap)
+        lo, hi = prev[rows, cols], nxt[rows, cols]
+        w = (cols - lo) / (hi - lo)
+        log_out = np.log(out[rows, lo]) * (1 - w) + np.log(out[rows, hi]) * w
+        out[rows, cols] = np.exp(log_out)
+    return out
+
+
+def clean(rates, window=WINDOW, threshold=THRESHOLD, fill="nan"):
+    """
+    Flag and clean a daily-rate matrix (or a single 1-D history).
+
+    Returns a ``Cleaned`` with arrays shaped like the input.
+    """
+    rates = np.asarray(rates, dtype=float)
+    single = rates.ndim == 1
+    matrix = np.atleast_2d(rates)
+    if matrix.shape[1] == 0:
+        # No months at all: nothing to flag and no peak
+        empty = Cleaned(matrix.copy(), np.zeros(matrix.shape, dtype=np.uint8), np.full(matrix.shape[0], -1))
+        return Cleaned(empty.rates[0], empty.flags[0], -1) if single else empty
+
+    flags = np.zeros(matrix.shape, dtype=np.uint8)
+    missing = np.isnan(matrix)
+    shut_in = ~missing & (matrix <= 0)
+    flags[missing] |= MISSING
+    flags[shut_in] |= SHUT_IN
+
+    producing = ~missing & ~shut_in
+    log_q = np.full(matrix.shape, np.nan)
+    log_q[producing] = np.log(matrix[producing])
+    median, mad, count = rolling_median_mad(log_q, window)
+    with np.errstate(invalid="ignore"):
+        scale = 1.4826 * np.maximum(mad, MIN_MAD)
+        outlier = producing & (count >= MIN_POINTS) & (np.abs(log_q - median) > threshold * scale)
+    flags[outlier] |= OUTLIER
+
+    bad = missing | shut_in | outlier
+    peak = find_peak(np.where(bad, np.nan, matrix))
+    flags[np.arange(matrix.shape[1]) < peak[:, np.newaxis]] |= PRE_PEAK
+
+    cleaned = fill_gaps(matrix, bad, fill)
+    if single:
+        return Cleaned(cleaned[0], flags[0], int(peak[0]))
+    return Cleaned(cleaned, flags, peak)
+
+
+def clean_well(well, **kwargs):
+    """Cleaned copy of a ``loader.WellData``; all phases go through one matrix."""
+    phases = well.phases()
+    if not phases:
+        return well
+    result = clean(pad(list(phases.values())), **kwargs)
+    arrays = {
+        name.lower(): result.rates[i, :len(values)]
+        for i, (name, values) in enumerate(phases.items())
+    }
+    return loader.WellData(well.api, **arrays)
@@ -0,0 +1,194 @@
+"""
+Memory-mapped columnar production store.
+
+    python columnar.py CSV_DIR STORE_DIR
+
+``build_store`` converts a directory of ``<API>.csv`` well files into one
+float32 file per phase (daily rates, NaN where a well lacks the phase), an
+int32 month-offset column and a sorted API index with each well's offset,
+length and first calendar month. ``ColumnarStore`` maps the files
+read-only, so opening a store costs almost nothing; ``well(api)`` returns
+zero-copy slices in the same ``loader.WellData`` form the CSV loader
+produces and ``months(api)`` the well's month offsets and first month.
+"""
+import argparse
+import functools
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import loader
+
+INDEX = "index.npy"
+META = "meta.json"
+MONTH = "month.i4"
+PHASE_FILES = {"Oil": "oil.f4", "Gas": "gas.f4", "Water": "water.f4"}
+
+
+def index_dtype(api_width):
+    """Index record with an API field wide enough for ``api_width`` characters."""
+    return np.dtype([
+        ("api", f"U{max(api_width, 1)}"),
+        ("offset", "<i8"),
+        ("length", "<i4"),
+        ("start", "<i4"),   # first month as year * 12 + month - 1, or -1 if undated
+        ("phases", "u1"),   # bit i set when loader.PHASES[i] is present
+    ])
+
+
+def month_offsets(months):
+    """
+    Months since the well's first row, and that first month.
+
+    ``MM/YYYY`` month columns give real calendar offsets (so gaps survive);
+    anything else is treated as consecutive months and the start is -1.
+    """
+    dates = pd.to_datetime(pd.Series(months, dtype=str), format="%m/%Y", errors="coerce")
+    if len(dates) and dates.notna().all():
+        absolute = (dates.dt.year * 12 + dates.dt.month - 1).to_numpy()
+        return (absolute - absolute[0]).astype(np.int32), int(absolute[0])
+    return np.arange(len(months), dtype=np.int32), -1
+
+
+def build_store(csv_paths, out_dir, progress=None):
+    """
+    Ingest well CSVs into a store at ``out_dir``; returns the well count.
+
+    Files are streamed one at a time and appended to the column files, so
+    memory use does not grow with the library. The index is written last;
+    a store without one is incomplete.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    index_path = os.path.join(out_dir, INDEX)
+    if os.path.exists(index_path):
+        os.remove(index_path)
+
+    names = dict(PHASE_FILES, Month=MONTH)
+    files = {k: open(os.path.join(out_dir, v), "wb") for k, v in names.items()}
+    entries = []
+    seen = set()
+    offset = 0
+    try:
+        for n, path in enumerate(csv_paths, 1):
+            api = loader.api_from_path(path)
+            if api in seen:
+                continue
+            seen.add(api)
+            df = loader.read_frame(path)
+            well = loader.well_from_frame(df, api)
+            length = len(df)
+            rates = well.phases()
+            bits = 0
+            for i, phase in enumerate(loader.PHASES):
+                values = rates.get(phase)
+                if values is None:
+                    values = np.full(length, np.nan)
+                else:
+                    bits |= 1 << i
+                files[phase].write(values.astype("<f4").tobytes())
+            months = df["Month"] if "Month" in df.columns else range(length)
+            offsets, start = month_offsets(months)
+            files["Month"].write(offsets.astype("<i4").tobytes())
+            entries.append((api, offset, length, start, bits))
+            offset += length
+            if progress and n % 1000 == 0:
+                progress(n)
+    finally:
+        for f in files.values():
+            f.close()
+
+    index = np.array(entries, dtype=index_dtype(max((len(e[0]) for e in entries), default=1)))
+    index.sort(order="api")
+    with open(os.path.join(out_dir, META), "w") as f:
+        json.dump({"rows": offset, "wells": len(index)}, f)
+    tmp = index_path + ".tmp.npy"
+    np.save(tmp, index)
+    os.replace(tmp, index_path)
+    return len(index)
+
+
+def _map(path, dtype, rows):
+    if rows == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(rows,))
+
+
+class ColumnarStore:
+    """Read-only view of a store written by ``build_store``."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META)) as f:
+            rows = json.load(f)["rows"]
+        self.index = np.load(os.path.join(path, INDEX), mmap_mode="r")
+        self.apis = self.index["api"]
+        self.columns = {
+            phase: _map(os.path.join(path, name), "<f4", rows)
+            for phase, name in PHASE_FILES.items()
+        }
+        self.month = _map(os.path.join(path, MONTH), "<i4", rows)
+
+    def __len__(self):
+        return len(self.apis)
+
+    def __contains__(self, api):
+        return self._position(api) is not None
+
+    def __iter__(self):
+        return iter(str(api) for api in self.apis)
+
+    def _position(self, api):
+        i = int(np.searchsorted(self.apis, api))
+        if i < len(self.apis) and self.apis[i] == api:
+            return i
+        return None
+
+    def _entry(self, api):
+        i = self._position(api)
+        if i is None:
+            raise KeyError(api)
+        return self.index[i]
+
+    def well(self, api):
+        """Daily rates for ``api`` as zero-copy float32 slices."""
+        entry = self._entry(api)
+        rows = slice(int(entry["offset"]), int(entry["offset"]) + int(entry["length"]))
+        arrays = {}
+        for i, phase in enumerate(loader.PHASES):
+            if entry["phases"] & (1 << i):
+                arrays[phase.lower()] = self.columns[phase][rows]
+        return loader.WellData(api, **arrays)
+
+    def months(self, api):
+        """Month offsets from first production and the first calendar month (-1 if undated)."""
+        entry = self._entry(api)
+        offset = int(entry["offset"])
+        return self.month[offset:offset + int(entry["length"])], int(entry["start"])
+
+
+@functools.lru_cache(maxsize=None)
+def open_store(path):
+    """Shared ``ColumnarStore`` for ``path``, opened once per process."""
+    return ColumnarStore(path)
+
+
+def is_store(path):
+    return os.path.exists(os.path.join(path, INDEX))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a directory of well CSVs into a columnar store.")
+    parser.add_argument("csv_dir", help="directory of <API>.csv production files")
+    parser.add_argument("store_dir", help="directory to write the store to")
+    args = parser.parse_args(argv)
+
+    paths = loader.list_csvs(args.csv_dir)
+    count = build_store(paths, args.store_dir, progress=lambda n: print(f"{n}/{len(paths)} wells", file=sys.stderr))
+    print(f"{count} wells written to {args.store_dir}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,23 +3,53 @@ Austin Caudill
 11/28/21
 V2.5
  """
-import time
-from inspect import EndOfBlock
+import functools
+import os
+import urllib.parse
+import uuid
 import dash
-from dash import dcc, html, dash_table
-from dash.dependencies import Input, Output, State
+from dash import Patch, ctx, dcc, html, dash_table
+from dash.dependencies import ClientsideFunction, Input, Output, State
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
+import flask
 import numpy as np
-import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
+import api as forecast_api
+import batch
+import cleaning
+import columnar
+import decimate
+import decline
+import export
+import fitting
+import jobs
+import loader
+import metrics
+import montecarlo
+import registry
+import tables
+import typecurve
+
 from dash_bootstrap_templates import load_figure_template
 load_figure_template("slate")
 
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.SLATE])
 app.title = 'Decline Curve Generator' 
 server = app.server
+metrics.register(server)
+forecast_api.register(server)
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Optional columnar store (see columnar.py) to read wells from instead of CSVs
+STORE = columnar.open_store(os.environ["DCA_STORE"]) if os.environ.get("DCA_STORE") else None
+
+# Well metadata (API, name, operator, basin) searched by the well dropdowns
+REGISTRY = registry.load_registry(os.environ.get("DCA_WELLS") or os.path.join(DATA_DIR, "wells.csv"))
+DEFAULT_WELL = "42-383-37763-0000"
 
 navbar = dbc.NavbarSimple(
     children=[
@@ -58,7 +88,7 @@ There are 2 methods of inputting data for plotting:
 
 1. Manually edit the cells to contain your data. Add and remove rows as needed.
 
-2. You may copy and paste your own data into the table. Note that you MUST have the required number of rows in the table BEFORE pasting in your data.
+2. Paste rows copied from a spreadsheet or CSV (Month, Oil, Water, Gas) into the box below the table and press "Load Pasted Data". This replaces the table with the pasted rows, however many there are.
 
 Only NUMBERS and INTEGERS are supported in the databale, i.e. 12345.12 is permissible while 1,2345.12 is not.
 ''')
@@ -79,6 +109,21 @@ Body = html.Div(
                  ),
             className="mb-3",
         ),
+        dbc.Card(
+            dbc.CardBody(
+                [
+                    dbc.Checklist(
+                        id="auto_fit",
+                        options=[{"label": "Auto-fit", "value": 1}],
+                        value=[],
+                        switch=True,
+                    ),
+                    html.Div(id="fit_output", className="small"),
+                    dcc.Store(id="fit_params"),
+                ]
+            ),
+            className="mb-3",
+        ),
         dbc.Card(body_md, body=True),
     ]
 )
@@ -200,16 +245,9 @@ sample_data = html.Div(
         dcc.Dropdown(
             id="radios",
             className="mb-4",
-            options=[
-                {"label": "Clear Sample Data", "value": 1},
-                {"label": "BOZEMAN UNIT 802WA", "value": 2},
-                {"label": "LYNN UNIT 2H", "value": 3},
-                {"label": "GOLDSMITH-LANDRETH/SAN ANDRES/UT 211R", "value": 4},
-                {"label": "SUGG-A- 1831HM", "value": 5},
-                {"label": "FALSETTE RANCH UNIT LAS A 2H", "value": 6},
-                {"label": "MCFADDEN 14-11H", "value": 7},
-            ],
-            value=5,
+            options=[REGISTRY.option(DEFAULT_WELL)],
+            value=DEFAULT_WELL,
+            placeholder="Search by API, name, operator or basin",
         ),
         html.Div(id="output"),
     ],
@@ -220,6 +258,49 @@ sidebar = dbc.Card([dbc.CardHeader("Choose b-value"), dbc.CardBody(Body, style={
 
 samples = dbc.Card([dbc.CardHeader("Sample Data"), dbc.CardBody(sample_data, style={})])
 
+type_curve_data = html.Div(
+    [
+        dcc.Dropdown(
+            id="type_wells",
+            className="mb-2",
+            options=[],
+            value=[],
+            multi=True,
+            placeholder="Wells to combine",
+        ),
+        dbc.RadioItems(
+            id="type_align",
+            options=[
+                {"label": "Align at peak", "value": "peak"},
+                {"label": "Align at first production", "value": "first"},
+            ],
+            value="peak",
+        ),
+        html.Div(id="type_output", className="small"),
+    ]
+)
+
+type_curve = dbc.Card([dbc.CardHeader("Type Curve (Oil)"), dbc.CardBody(type_curve_data, style={})], className="mt-3")
+
+export_data = html.Div(
+    [
+        html.P("Oil forecasts for the type curve wells, or the sample well when none are chosen.", className="small"),
+        dbc.RadioItems(
+            id="export_format",
+            options=[
+                {"label": "CSV", "value": "csv"},
+                {"label": "Parquet", "value": "parquet", "disabled": not export.parquet_available()},
+                {"label": "ARIES (AC_PRODUCT)", "value": "aries"},
+            ],
+            value="csv",
+            className="mb-2",
+        ),
+        html.A(dbc.Button("Export Forecasts", color="secondary"), id="export_link", href="", download=""),
+    ]
+)
+
+export_card = dbc.Card([dbc.CardHeader("Export"), dbc.CardBody(export_data)], className="mt-3")
+
 notes = dbc.Card(
     [
         dbc.CardHeader("Notes"), 
@@ -229,34 +310,193 @@ notes = dbc.Card(
     class_name="mb-4"
 )
 
+TRACE_ORDER = ("Oil", "Water", "Gas")
+TRACE_COLORS = {"Oil": "green", "Water": "blue", "Gas": "red"}
+
+# Fixed trace positions in the figure, so callbacks can patch their own traces
+RATE_TRACE, CUM_TRACE = 0, 1
+SAMPLE_TRACES = {"Oil": 2, "Water": 3, "Gas": 4}
+TABLE_TRACES = {"Oil": 5, "Water": 6, "Gas": 7}
+TYPE_TRACES = {"P10": 8, "P50": 9, "P90": 10, "Fit": 11}
+TYPE_STYLES = {
+    "P10": dict(color='orange', width=1, dash='dot'),
+    "P50": dict(color='orange', width=2),
+    "P90": dict(color='orange', width=1, dash='dot'),
+    "Fit": dict(color='yellow', width=2, dash='dash'),
+}
+
+
+def base_figure():
+    """Empty figure with every trace the callbacks fill in."""
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    fig.add_trace(go.Scatter(x=[], y=[], name='Rate (q)', line=dict(color='white', width=4)))
+    fig.add_trace(go.Scatter(x=[], y=[], name='Cum Production (Np)', line=dict(color='white', width=4, dash='dash')), secondary_y=True)
+    for traces in (SAMPLE_TRACES, TABLE_TRACES):
+        for phase in TRACE_ORDER:
+            fig.add_trace(go.Scatter(x=[], y=[], name=f'{phase} Production', visible=False, line=dict(color=TRACE_COLORS[phase], width=1)))
+    for band in TYPE_TRACES:
+        fig.add_trace(go.Scatter(x=[], y=[], name=f'Type Curve {band}', visible=False, line=TYPE_STYLES[band]))
+
+    # Set x-axis title
+    fig.update_xaxes(title_text="Cumulative Time (Months)")
+
+    # Set y-axes titles
+    fig.update_yaxes(title_text="Rate (STB/Day or MCF/Day)", secondary_y=False)
+    fig.update_yaxes(title_text="Cum Production (MMSTB)", secondary_y=True)
+
+    fig.update_layout(
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        )
+        )
+    return fig
+
+
+def view_args(view):
+    """Plot width in pixels and zoomed x range, if any, from the view store."""
+    view = view or {}
+    x_range = (view["x0"], view["x1"]) if view.get("x0") is not None else None
+    return view.get("width") or decimate.DEFAULT_WIDTH, x_range
+
+
+def patch_production_traces(patch, traces, well, phases, view=None):
+    """
+    Point each trace in ``traces`` at the well's rates, hiding absent phases.
+
+    Long series are decimated to the plot width and the visible x range and
+    drawn with WebGL.
+    """
+    width, x_range = view_args(view)
+    rates = well.phases() if well is not None else {}
+    for phase, i in traces.items():
+        y = rates.get(phase) if phase in phases else None
+        if y is None:
+            patch["data"][i]["x"] = []
+            patch["data"][i]["y"] = []
+            patch["data"][i]["visible"] = False
+        else:
+            x, y, trace_type = decimate.for_plot(np.arange(len(y)), y, width, x_range)
+            patch["data"][i]["type"] = trace_type
+            patch["data"][i]["x"] = x
+            patch["data"][i]["y"] = y
+            patch["data"][i]["visible"] = True
+
+
+def skip_view_update(well, view):
+    """True when a zoom cannot change what is drawn for ``well``."""
+    width, _ = view_args(view)
+    return ctx.triggered_id == "view" and (well is None or len(well) <= width)
+
+
+def load_sample_well(api):
+    """Production for a registry API and the phases to plot, or (None, ())."""
+    info = REGISTRY.get(api) if api else None
+    if info is None:
+        return None, ()
+    if STORE is not None and api in STORE:
+        return STORE.well(api), info.phases
+    path = os.path.join(DATA_DIR, f"{api}.csv")
+    if not os.path.exists(path):
+        return None, ()
+    return loader.load_well(path), info.phases
+
+
+def load_table_well(session):
+    return loader.well_from_frame(tables.store.get(session))
+
+
 graph_card = dbc.Card(
     dbc.CardBody(
         [
             dcc.Loading(
             id="loading-1",
             type="default",
-            children=html.Div(id="loading-output-1")
+            children=dcc.Graph(id="fig", figure=base_figure(), style={"height": 400})
         ),
-            dcc.Graph(id="fig", style={"height": 400})
+            dcc.Store(id="view"),
         ]
         ), 
         className="my-4"
 )
 
-params = [
-    'Month', 'Oil', 'Water', 'Gas'
+# Low (P90) and high (P10) defaults for the Monte Carlo inputs
+MC_RANGES = [
+    ("qi", "qi (STB/day)", 200, 350),
+    ("di", "Di (nominal /month)", 0.03, 0.07),
+    ("b", "b", 0.7, 1.0),
+    ("dmin", "Terminal decline (effective %/yr)", 5, 8),
 ]
 
+
+MC_MAX_N = 10000000
+
+
+def mc_input(param, bound, value):
+    return dcc.Input(id=f"mc_{param}_{bound}", type='number', value=value, style={"width": "100%"})
+
+
+mc_card = dbc.Card(
+    [
+        dbc.CardHeader("Probabilistic EUR"),
+        dbc.CardBody(
+            [
+                dbc.Row(
+                    [
+                        dbc.Col(
+                            dbc.Table(
+                                [html.Thead(html.Tr([html.Th("Parameter"), html.Th("Low (P90)"), html.Th("High (P10)")]))]
+                                + [html.Tbody([
+                                    html.Tr([html.Td(label), html.Td(mc_input(param, "low", low)), html.Td(mc_input(param, "high", high))])
+                                    for param, label, low, high in MC_RANGES
+                                ])],
+                                bordered=True,
+                                size="sm",
+                            ),
+                            width=6,
+                        ),
+                        dbc.Col(
+                            [
+                                html.P("qi and Di are lognormal, b and terminal decline uniform.", className="small"),
+                                dbc.Label("Realizations"),
+                                dcc.Input(id="mc_n", type='number', value=100000, min=1000, max=MC_MAX_N, step=1000, className="mb-2", style={"width": "100%"}),
+                                dbc.Label("Seed"),
+                                dcc.Input(id="mc_seed", type='number', value=1, min=0, step=1, className="mb-2", style={"width": "100%"}),
+                                dbc.Button("Run", id="mc_run", n_clicks=0, color="secondary", className="me-1"),
+                                dbc.Button("Cancel", id="mc_cancel", n_clicks=0, color="secondary", outline=True),
+                            ],
+                            width=6,
+                        ),
+                    ]
+                ),
+                dbc.Progress(id="mc_progress", value=0, className="my-2"),
+                html.Div(id="mc_output", className="small"),
+                dcc.Store(id="mc_job"),
+                dcc.Interval(id="mc_poll", interval=500, disabled=True),
+                dcc.Loading(dcc.Graph(id="mc_fig", style={"height": 300})),
+            ]
+        ),
+    ],
+    className="mb-4",
+)
+
+params = list(tables.COLUMNS)
+
+PAGE_SIZE = 50
+
 prod_table = html.Div([
     dash_table.DataTable(
         id='prod_table',
         columns=(
             [{'id': p, 'name': p} for p in params]
         ),
-        data=[
-            dict(Model=i, **{param: 0 for param in params})
-            for i in range(1, 1)
-        ],
+        data=[],
+        page_action='custom',
+        page_current=0,
+        page_size=PAGE_SIZE,
         style_header={
         'backgroundColor': '#515960',
         'color': '#aaaaaa',
@@ -271,275 +511,431 @@ prod_table = html.Div([
         row_deletable=True,
         # export_format="csv",
     ),
-    dbc.Button('Add Row', id='editing-rows-button', n_clicks=0, color="secondary", className="me-1 mb-4"),
+    dbc.Button('Add Row', id='editing-rows-button', n_clicks=0, color="secondary", className="me-1"),
+    dcc.Textarea(id='paste_text', placeholder='Paste Month, Oil, Water, Gas rows here', style={'height': 100}),
+    dbc.Button('Load Pasted Data', id='paste_button', n_clicks=0, color="secondary", className="me-1 mb-4"),
+    dcc.Store(id='table_version', data=0),
 ],
 className="d-grid gap-2",
 )
 
 
-app.layout = dbc.Container(
-    [
-        navbar,
-        dbc.Row(
-            [
-                dbc.Col(
-                    [
-                        dbc.Col([sidebar]),
-                        dbc.Col([samples])
-                    ],
-                    width=3,
-                ),
-                dbc.Col(
-                    [
-                        dbc.Row(inputs),
-                        graph_card,
-                    ],
-                    width=8,
-                ),
-            ]
-        ),
-        dbc.Row(
-            [
-                dbc.Col([notes], width=3),
-                dbc.Col(
-                    [
-                        prod_table
-                    ],
-                    width=8,
-                ),
-            ]
-        ),
-        footer,
-    ],
-    fluid=True,
-)
+def serve_layout():
+    # A fresh session id per page load keys this browser's table in tables.store
+    return dbc.Container(
+        [
+            dcc.Store(id='session_id', data=uuid.uuid4().hex),
+            navbar,
+            dbc.Row(
+                [
+                    dbc.Col(
+                        [
+                            dbc.Col([sidebar]),
+                            dbc.Col([samples]),
+                            dbc.Col([type_curve]),
+                            dbc.Col([export_card]),
+                        ],
+                        width=3,
+                    ),
+                    dbc.Col(
+                        [
+                            dbc.Row(inputs),
+                            graph_card,
+                            mc_card,
+                        ],
+                        width=8,
+                    ),
+                ]
+            ),
+            dbc.Row(
+                [
+                    dbc.Col([notes], width=3),
+                    dbc.Col(
+                        [
+                            prod_table
+                        ],
+                        width=8,
+                    ),
+                ]
+            ),
+            footer,
+        ],
+        fluid=True,
+    )
+
 
-@app.callback(Output("loading-output-1", "children"), Input("radios", "value"))
-def input_triggers_spinner(value):
-    time.sleep(2)
-    return
+app.layout = serve_layout
 
 @app.callback(Output("output", "children"), [Input("radios", "value")])
+@metrics.timed("dca_callback_seconds")
 def well_information(value):
-    if value == 2:
-        # table_header = [html.Thead(html.Tr([html.Th("Property"), html.Th("Value")]))]
-        row1 = html.Tr([html.Td("Well Name:"), html.Td("BOZEMAN UNIT 802WA")])
-        row2 = html.Tr([html.Td("API:"), html.Td("42-329-41603-0000")])
-        row3 = html.Tr([html.Td("Basin:"), html.Td("Permian")])
-        row4 = html.Tr([html.Td("Operator:"), html.Td("Diamondback E&P LLC")])
-        table_body = [html.Tbody([row1, row2, row3, row4])]
-        info_card = dbc.Table(table_body, bordered=True)
-    elif value == 3:
-        # table_header = [html.Thead(html.Tr([html.Th("Property"), html.Th("Value")]))]
-        row1 = html.Tr([html.Td("Well Name:"), html.Td("LYNN UNIT 2H")])
-        row2 = html.Tr([html.Td("API:"), html.Td("42-337-34517-0000")])
-        row3 = html.Tr([html.Td("Basin:"), html.Td("Fort Worth Syncline")])
-        row4 = html.Tr([html.Td("Operator:"), html.Td("EOG Resources, Inc")])
-        table_body = [html.Tbody([row1, row2, row3, row4])]
-        info_card = dbc.Table(table_body, bordered=True)
-    elif value == 4:
-        # table_header = [html.Thead(html.Tr([html.Th("Property"), html.Th("Value")]))]
-        row1 = html.Tr([html.Td("Well Name:"), html.Td("GOLDSMITH-LANDRETH/SAN ANDRES/UT 211R")])
-        row2 = html.Tr([html.Td("API:"), html.Td("42-135-41592-0000")])
-        row3 = html.Tr([html.Td("Basin:"), html.Td("Permian")])
-        row4 = html.Tr([html.Td("Operator:"), html.Td("KINDER MORGAN PRODUCTION CO LLC")])
-        table_body = [html.Tbody([row1, row2, row3, row4])]
-        info_card = dbc.Table(table_body, bordered=True)
-    elif value == 5:
-        # table_header = [html.Thead(html.Tr([html.Th("Property"), html.Th("Value")]))]
-        row1 = html.Tr([html.Td("Well Name:"), html.Td("SUGG-A- 1831HM")])
-        row2 = html.Tr([html.Td("API:"), html.Td("42-383-37763-0000")])
-        row3 = html.Tr([html.Td("Basin:"), html.Td("Permian")])
-        row4 = html.Tr([html.Td("Operator:"), html.Td("LAREDO PETROLEUM, INC.")])
-        table_body = [html.Tbody([row1, row2, row3, row4])]
-        info_card = dbc.Table(table_body, bordered=True)
-    elif value == 6:
-        # table_header = [html.Thead(html.Tr([html.Th("Property"), html.Th("Value")]))]
-        row1 = html.Tr([html.Td("Well Name:"), html.Td("FALSETTE RANCH UNIT LAS A 2H")])
-        row2 = html.Tr([html.Td("API:"), html.Td("42-283-34005-0000")])
-        row3 = html.Tr([html.Td("Basin:"), html.Td("Gulf Coast Basin (LA - TX)")])
-        row4 = html.Tr([html.Td("Operator:"), html.Td("CHESAPEAKE OPERATING, L.L.C.")])
-        table_body = [html.Tbody([row1, row2, row3, row4])]
-        info_card = dbc.Table(table_body, bordered=True)
-    elif value == 7:
-        # table_header = [html.Thead(html.Tr([html.Th("Property"), html.Th("Value")]))]
-        row1 = html.Tr([html.Td("Well Name:"), html.Td("MCFADDEN 14-11H")])
-        row2 = html.Tr([html.Td("API:"), html.Td("33-025-03304-0000")])
-        row3 = html.Tr([html.Td("Basin:"), html.Td("Williston Basin")])
-        row4 = html.Tr([html.Td("Operator:"), html.Td("MARATHON OIL COMPANY")])
-        table_body = [html.Tbody([row1, row2, row3, row4])]
-        info_card = dbc.Table(table_body, bordered=True)
-    else:
-        info_card = "No sample data selected."
-    return info_card
+    info = REGISTRY.get(value) if value else None
+    if info is None:
+        return "No sample data selected."
+    rows = [
+        ("Well Name:", info.name),
+        ("API:", info.api),
+        ("Basin:", info.basin),
+        ("Operator:", info.operator),
+    ]
+    return dbc.Table([html.Tbody([html.Tr([html.Td(k), html.Td(v)]) for k, v in rows])], bordered=True)
 
+
+# Well dropdowns search the registry on the server instead of shipping every option
 @app.callback(
-    Output('prod_table', 'data'),
+    Output("radios", "options"),
+    Input("radios", "search_value"),
+    State("radios", "value"))
+@metrics.timed("dca_callback_seconds")
+def search_wells(search, value):
+    return REGISTRY.options(search or "", [value])
+
+
+@app.callback(
+    Output("type_wells", "options"),
+    Input("type_wells", "search_value"),
+    State("type_wells", "value"))
+@metrics.timed("dca_callback_seconds")
+def search_type_wells(search, value):
+    return REGISTRY.options(search or "", value or [])
+
+
+@app.callback(
+    Output('table_version', 'data'),
+    Output('paste_text', 'value'),
     Input('editing-rows-button', 'n_clicks'),
+    Input('paste_button', 'n_clicks'),
+    Input('prod_table', 'data_timestamp'),
     State('prod_table', 'data'),
-    State('prod_table', 'columns'))
-def add_row(n_clicks, rows, columns):
-    if n_clicks > 0:
-        rows.append({c['id']: '0' for c in columns})
-    return rows
-   
+    State('prod_table', 'page_current'),
+    State('prod_table', 'page_size'),
+    State('paste_text', 'value'),
+    State('session_id', 'data'),
+    prevent_initial_call=True)
+@metrics.timed("dca_callback_seconds")
+def edit_table(add_clicks, paste_clicks, timestamp, rows, page_current, page_size, paste_text, session):
+    paste_value = dash.no_update
+    if ctx.triggered_id == 'editing-rows-button':
+        tables.store.append_row(session)
+    elif ctx.triggered_id == 'paste_button':
+        tables.store.replace(session, tables.parse_paste(paste_text or ''))
+        paste_value = ''
+    else:
+        # Only the edited rows of the visible page reach the store
+        start = (page_current or 0) * page_size
+        change = tables.diff_rows(rows, tables.store.page(session, page_current or 0, page_size))
+        if change is None:
+            raise PreventUpdate
+        kind, detail = change
+        if kind == 'delete':
+            tables.store.delete_row(session, start + detail)
+        else:
+            tables.store.set_rows(session, [(start + i, row) for i, row in detail])
+    return tables.store.version(session), paste_value
+
+
+@app.callback(
+    Output('prod_table', 'data'),
+    Output('prod_table', 'page_count'),
+    Input('table_version', 'data'),
+    Input('prod_table', 'page_current'),
+    Input('prod_table', 'page_size'),
+    State('session_id', 'data'))
+@metrics.timed("dca_callback_seconds")
+def render_table(version, page_current, page_size, session):
+    n_rows = tables.store.n_rows(session)
+    page_count = max(1, -(-n_rows // page_size))
+    return tables.store.page(session, page_current or 0, page_size), page_count
+
+
 @app.callback(
-    Output('fig', 'figure'),
+    Output('fit_params', 'data'),
+    Output('fit_output', 'children'),
+    Input("auto_fit", "value"),
+    Input("radios", "value"),
+    Input('table_version', 'data'),
+    State('session_id', 'data'))
+@metrics.timed("dca_callback_seconds")
+def update_fit(auto_fit, radios, version, session):
+    if not auto_fit:
+        # Data changes only matter to the forecast when it is fit to that data
+        if ctx.triggered_id in ("radios", "table_version"):
+            raise PreventUpdate
+        return None, ""
+
+    # Fit to the selected sample well, otherwise the user table
+    history, _ = load_sample_well(radios)
+    if history is None:
+        history = load_table_well(session)
+    with metrics.timer("dca_stage_seconds", "fit"):
+        fit = fitting.fit_arps(cleaning.clean(history.oil).rates) if history.oil is not None else fitting.FAILED
+    if not fit.success:
+        return None, "Not enough oil history to fit."
+    fit_info = f"qi = {fit.qi:.1f}, Di = {fit.di:.4f} /month, b = {fit.b:.2f}"
+    return dict(qi=fit.qi, di=fit.di, b=fit.b, t0=fit.t0), fit_info
+
+
+# Forecast curve is evaluated in the browser (assets/decline.js)
+app.clientside_callback(
+    ClientsideFunction(namespace="decline", function_name="forecast"),
+    Output('fig', 'figure', allow_duplicate=True),
     Input('q_init', 'value'),
     Input('q_next', 'value'),
     Input('t_months', 'value'),
     Input('t_tot', 'value'),
     Input('t_init', 'value'),
     Input('b_value', 'value'),
-    Input('prod_table', 'data'),
-    Input('prod_table', 'columns'),
-    Input("radios", "value"))
-def update_fig(q_init,q_next,t_months, t_tot, t_init, b_value, rows, columns, radios):
-    # Input Data
-    t_tot = int(t_tot)
-    t_init = float(t_init)
-    t = np.arange(0.001,t_tot,0.5)
-    t_0m = 0 # month
-    q_init = int(q_init)
-    q_next = int(q_next)/30.437
-    t_months = int(t_months)
-    b_value = float(b_value)
-
-    D = np.log(q_init/q_next)/(t_months - t_0m) # Decline Rate
-
-    def determine_decline(b_value, q_init, t, D):
-        if b_value == 0:
-            decline_choice = "Exponential"
-            q = q_init*np.exp(-t*D)
-            Np = (((q_init**b_value) / ((1 - b_value) * D)) * ((q_init ** (1 - b_value)) - (q ** (1 - b_value))))
-        elif 0< b_value < 1:
-            decline_choice = "Hyperbolic"
-            q = q_init*np.power((1+b_value*D*t),(-(1/b_value)))
-            Np = (((q_init**b_value) / ((1 - b_value) * D)) * ((q_init ** (1 - b_value)) - (q ** (1 - b_value))))
-        elif b_value == 1:
-            decline_choice = "Harmonic"
-            q = q_init*np.power((1+b_value*D*t),(-1/b_value))
-            Np = (q_init/D)*np.log(q_init/q)
-        else:
-            decline_choice = "Invalid b-value"   
-        return decline_choice, q, Np 
+    Input('fit_params', 'data'),
+    Input('view', 'data'),
+    State('fig', 'figure'),
+    prevent_initial_call='initial_duplicate')
 
-    decline_choice, q, Np = determine_decline(b_value, q_init, t, D)
- 
 
-    # Plot Calculations
-    fig = make_subplots(specs=[[{"secondary_y": True}]])
-    fig.add_trace(go.Scatter(x=(t+t_init), y=q, name='Rate (q)', line=dict(color='white', width=4)))
-    fig.add_trace(go.Scatter(x=(t+t_init), y=Np, name='Cum Production (Np)', line=dict(color='white', width=4, dash='dash')), secondary_y=True)
-
-    # Plot user-selected sample data
-    if radios == 2:
-        sd2 = pd.read_csv("42-329-41603-0000.csv")
-        sd2['Oil'] = sd2['Oil'].astype(float)
-        sd2['Oil'] = sd2['Oil'].div(30.437)
-        # sd2['Water'] = sd2['Water'].astype(float)
-        # sd2['Water'] = sd2['Water'].div(30.437)
-        sd2['Gas'] = sd2['Gas'].astype(float)
-        sd2['Gas'] = sd2['Gas'].div(30.437)
-        fig.add_trace(go.Scatter(x=sd2.index, y=sd2['Oil'], name='Oil Production', line=dict(color='green', width=1)))
-        # fig.add_trace(go.Scatter(x=sd2.index, y=sd2['Water'], name='Water Production', line=dict(color='blue', width=1)))
-        fig.add_trace(go.Scatter(x=sd2.index, y=sd2['Gas'], name='Gas Production', line=dict(color='red', width=1)))
-    elif radios == 3:
-        sd3 = pd.read_csv("42-337-34517-0000.csv")
-        sd3.replace('-', '0', inplace=True)
-        sd3['Oil'] = sd3['Oil'].astype(float)
-        sd3['Oil'] = sd3['Oil'].div(30.437)
-        sd3['Water'] = sd3['Water'].astype(float)
-        sd3['Water'] = sd3['Water'].div(30.437)
-        sd3['Gas'] = sd3['Gas'].astype(float)
-        sd3['Gas'] = sd3['Gas'].div(30.437)
-        fig.add_trace(go.Scatter(x=sd3.index, y=sd3['Oil'], name='Oil Production', line=dict(color='green', width=1)))
-        fig.add_trace(go.Scatter(x=sd3.index, y=sd3['Water'], name='Water Production', line=dict(color='blue', width=1)))
-        fig.add_trace(go.Scatter(x=sd3.index, y=sd3['Gas'], name='Gas Production', line=dict(color='red', width=1)))
-    elif radios == 4:
-        sd4 = pd.read_csv("42-135-41592-0000.csv")
-        sd4.replace('-', '0', inplace=True)
-        sd4['Oil'] = sd4['Oil'].astype(float)
-        sd4['Oil'] = sd4['Oil'].div(30.437)
-        sd4['Water'] = sd4['Water'].astype(float)
-        sd4['Water'] = sd4['Water'].div(30.437)
-        sd4['Gas'] = sd4['Gas'].astype(float)
-        sd4['Gas'] = sd4['Gas'].div(30.437)
-        fig.add_trace(go.Scatter(x=sd4.index, y=sd4['Oil'], name='Oil Production', line=dict(color='green', width=1)))
-        fig.add_trace(go.Scatter(x=sd4.index, y=sd4['Water'], name='Water Production', line=dict(color='blue', width=1)))
-        fig.add_trace(go.Scatter(x=sd4.index, y=sd4['Gas'], name='Gas Production', line=dict(color='red', width=1)))
-    elif radios == 5:
-        sd5 = pd.read_csv("42-383-37763-0000.csv")
-        sd5.replace('-', '0', inplace=True)
-        sd5['Oil'] = sd5['Oil'].astype(float)
-        sd5['Oil'] = sd5['Oil'].div(30.437)
-        sd5['Water'] = sd5['Water'].astype(float)
-        sd5['Water'] = sd5['Water'].div(30.437)
-        sd5['Gas'] = sd5['Gas'].astype(float)
-        sd5['Gas'] = sd5['Gas'].div(30.437)
-        fig.add_trace(go.Scatter(x=sd5.index, y=sd5['Oil'], name='Oil Production', line=dict(color='green', width=1)))
-        fig.add_trace(go.Scatter(x=sd5.index, y=sd5['Water'], name='Water Production', line=dict(color='blue', width=1)))
-        #fig.add_trace(go.Scatter(x=sd5.index, y=sd5['Gas'], name='Gas Production', line=dict(color='red', width=1)))
-    elif radios == 6:
-        sd6 = pd.read_csv("42-283-34005-0000.csv")
-        sd6.replace('-', '0', inplace=True)
-        sd6['Oil'] = sd6['Oil'].astype(float)
-        sd6['Oil'] = sd6['Oil'].div(30.437)
-        sd6['Water'] = sd6['Water'].astype(float)
-        sd6['Water'] = sd6['Water'].div(30.437)
-        sd6['Gas'] = sd6['Gas'].astype(float)
-        sd6['Gas'] = sd6['Gas'].div(30.437)
-        fig.add_trace(go.Scatter(x=sd6.index, y=sd6['Oil'], name='Oil Production', line=dict(color='green', width=1)))
-        fig.add_trace(go.Scatter(x=sd6.index, y=sd6['Water'], name='Water Production', line=dict(color='blue', width=1)))
-        fig.add_trace(go.Scatter(x=sd6.index, y=sd6['Gas'], name='Gas Production', line=dict(color='red', width=1)))
-    elif radios == 7:
-        sd7 = pd.read_csv("33-025-03304-0000.csv")
-        sd7.replace('-', '0', inplace=True)
-        sd7['Oil'] = sd7['Oil'].astype(float)
-        sd7['Oil'] = sd7['Oil'].div(30.437)
-        sd7['Water'] = sd7['Water'].astype(float)
-        sd7['Water'] = sd7['Water'].div(30.437)
-        sd7['Gas'] = sd7['Gas'].astype(float)
-        sd7['Gas'] = sd7['Gas'].div(30.437)
-        fig.add_trace(go.Scatter(x=sd7.index, y=sd7['Oil'], name='Oil Production', line=dict(color='green', width=1)))
-        fig.add_trace(go.Scatter(x=sd7.index, y=sd7['Water'], name='Water Production', line=dict(color='blue', width=1)))
-        fig.add_trace(go.Scatter(x=sd7.index, y=sd7['Gas'], name='Gas Production', line=dict(color='red', width=1)))
-    else:
-        pass
-    
-
-
-    # Plot User Inputted Production Values
-    df = pd.DataFrame(rows, columns=[c['name'] for c in columns])
-    df['Oil'] = df['Oil'].astype(float)
-    df['Oil'] = df['Oil'].div(30.437)
-    df['Water'] = df['Water'].astype(float)
-    df['Water'] = df['Water'].div(30.437)
-    df['Gas'] = df['Gas'].astype(float)
-    df['Gas'] = df['Gas'].div(30.437)
-    fig.add_trace(go.Scatter(x=df.index, y=df['Oil'], name='Oil Production', line=dict(color='green', width=1)))
-    fig.add_trace(go.Scatter(x=df.index, y=df['Water'], name='Water Production', line=dict(color='blue', width=1)))
-    fig.add_trace(go.Scatter(x=df.index, y=df['Gas'], name='Gas Production', line=dict(color='red', width=1)))
+# Track zoom and plot width so traces can be resampled for what is on screen
+app.clientside_callback(
+    ClientsideFunction(namespace="decline", function_name="view"),
+    Output('view', 'data'),
+    Input('fig', 'relayoutData'))
 
-    # Set x-axis title
-    fig.update_xaxes(title_text="Cumulative Time (Months)")
 
-    # Set y-axes titles
-    fig.update_yaxes(title_text="Rate (STB/Day or MCF/Day)", secondary_y=False)
-    fig.update_yaxes(title_text="Cum Production (MMSTB)", secondary_y=True)
+# Plot user-selected sample data
+@app.callback(
+    Output('fig', 'figure', allow_duplicate=True),
+    Input("radios", "value"),
+    Input('view', 'data'),
+    prevent_initial_call='initial_duplicate')
+@metrics.timed("dca_callback_seconds")
+def update_sample_traces(radios, view):
+    well, phases = load_sample_well(radios)
+    if skip_view_update(well, view):
+        raise PreventUpdate
+    fig = Patch()
+    patch_production_traces(fig, SAMPLE_TRACES, well, phases, view)
+    return fig
 
-    fig.update_layout(
-        title={'text': f"{decline_choice} Decline Curve"},
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="right",
-            x=1
-        )
-        )
+
+# Plot User Inputted Production Values
+@app.callback(
+    Output('fig', 'figure', allow_duplicate=True),
+    Input('table_version', 'data'),
+    Input('view', 'data'),
+    State('session_id', 'data'),
+    prevent_initial_call='initial_duplicate')
+@metrics.timed("dca_callback_seconds")
+def update_table_traces(version, view, session):
+    well = load_table_well(session)
+    if skip_view_update(well, view):
+        raise PreventUpdate
+    fig = Patch()
+    patch_production_traces(fig, TABLE_TRACES, well, TRACE_ORDER, view)
     return fig
 
 
+
+# Plot a type curve over the chosen sample wells
+@app.callback(
+    Output('fig', 'figure', allow_duplicate=True),
+    Output('type_output', 'children'),
+    Input('type_wells', 'value'),
+    Input('type_align', 'value'),
+    prevent_initial_call=True)
+@metrics.timed("dca_callback_seconds")
+def update_type_curve(type_wells, type_align):
+    fig = Patch()
+    wells = [load_sample_well(value)[0] for value in type_wells or []]
+    histories = [well.oil for well in wells if well is not None and well.oil is not None]
+    if not histories:
+        for i in TYPE_TRACES.values():
+            fig["data"][i]["visible"] = False
+        return fig, ""
+
+    curve = typecurve.build(histories, type_align, min_wells=1)
+    bands = dict(curve.rate)
+    if curve.fit.success:
+        bands["Fit"] = decline.arps_rate(curve.fit.qi, curve.fit.di, curve.fit.b, curve.months)[0]
+    for band, i in TYPE_TRACES.items():
+        fig["data"][i]["x"] = curve.months
+        fig["data"][i]["y"] = bands.get(band, [])
+        fig["data"][i]["visible"] = band in bands
+
+    info = f"{len(histories)} wells"
+    if curve.fit.success:
+        info += f"; P50 fit qi = {curve.fit.qi:.1f}, Di = {curve.fit.di:.4f} /month, b = {curve.fit.b:.2f}"
+    return fig, info
+
+
+def sample_source(api):
+    """``(well_dir, source)`` of a registry well for ``batch.read_well``, or None."""
+    if STORE is not None and api in STORE:
+        return STORE.path, api
+    path = os.path.join(DATA_DIR, f"{api}.csv")
+    return (DATA_DIR, path) if api in REGISTRY and os.path.exists(path) else None
+
+
+def export_fits(apis, chunk_wells=export.CHUNK_WELLS):
+    """
+    ``(apis, fits, last_months)`` chunks of oil fits for registry wells,
+    loaded and fit as they are needed.
+    """
+    for start in range(0, len(apis), chunk_wells):
+        chunk = apis[start:start + chunk_wells]
+        fits, last = [], []
+        for api in chunk:
+            source = sample_source(api)
+            well, months = batch.read_well(*source) if source else (None, None)
+            if well is None or well.oil is None:
+                fits.append(fitting.FAILED)
+                last.append("")
+                continue
+            fits.append(fitting.fit_arps(cleaning.clean(well.oil).rates))
+            last.append(batch.last_month(months, fits[-1].t_last))
+        yield chunk, fits, last
+
+
+# Exports stream from a plain route; a dcc.Download would hold the whole file in one response
+@server.route("/export/forecast")
+def export_forecast():
+    args = flask.request.args
+    fmt = args.get("format", "csv")
+    if fmt not in export.FORMATS:
+        flask.abort(400)
+    if fmt == "parquet" and not export.parquet_available():
+        # Fail before the headers go out rather than truncate the download
+        flask.abort(400, description="Parquet export requires pyarrow")
+    apis = [api for api in args.getlist("api") if api in REGISTRY]
+    months = args.get("months", export.MONTHS, type=int)
+    if not 0 < months <= forecast_api.MAX_MONTHS:
+        flask.abort(400)
+    chunks = export_fits(apis)
+    if fmt == "aries":
+        # ARIES rows need each well's last production date; check them before
+        # the headers go out. The fits are small next to the forecasts.
+        chunks = list(chunks)
+        undated = [a for c in chunks for a, fit, last in zip(*c) if fit.success and not last]
+        if undated:
+            flask.abort(400, description=f"ARIES export needs MM/YYYY production months; undated: {', '.join(undated)}")
+    frames = export.forecast_chunks(chunks, months)
+    response = flask.Response(
+        flask.stream_with_context(export.stream(frames, fmt)),
+        mimetype=export.MEDIA_TYPES[fmt],
+    )
+    response.headers["Content-Disposition"] = f"attachment; filename=forecast.{export.EXTENSIONS[fmt]}"
+    return response
+
+
+@app.callback(
+    Output("export_link", "href"),
+    Input("radios", "value"),
+    Input("type_wells", "value"),
+    Input("export_format", "value"))
+@metrics.timed("dca_callback_seconds")
+def update_export_link(radios, type_wells, fmt):
+    apis = type_wells or ([radios] if radios else [])
+    query = urllib.parse.urlencode([("format", fmt)] + [("api", api) for api in apis])
+    return f"/export/forecast?{query}"
+
+
+def mc_input_error(ranges, n, seed):
+    """Why the Monte Carlo card's inputs cannot be run, or None."""
+    values = [v for pair in ranges.values() for v in pair] + [n, seed]
+    if any(v is None for v in values):
+        return "Fill in every range, the realization count and the seed."
+    if not 1 <= n <= MC_MAX_N:
+        return f"Realizations must be between 1 and {MC_MAX_N:,}."
+    if seed < 0 or seed != int(seed):
+        return "The seed must be a whole number of at least 0."
+    for name, (low, high) in ranges.items():
+        if low > high:
+            return f"The {name} low case must not be above its high case."
+    if ranges["qi"][0] <= 0 or ranges["Di"][0] <= 0:
+        return "The qi and Di lows must be above 0 (they are lognormal)."
+    if ranges["b"][0] < 0:
+        return "The b low must be at least 0."
+    if ranges["Dmin"][0] < 0 or ranges["Dmin"][1] >= 100:
+        return "Dmin must be at least 0% and below 100%."
+    return None
+
+
+# Monte Carlo runs as a background job; the interval polls it until it ends
+@app.callback(
+    Output('mc_job', 'data'),
+    Output('mc_poll', 'disabled'),
+    Output('mc_output', 'children', allow_duplicate=True),
+    Input('mc_run', 'n_clicks'),
+    State('mc_qi_low', 'value'),
+    State('mc_qi_high', 'value'),
+    State('mc_di_low', 'value'),
+    State('mc_di_high', 'value'),
+    State('mc_b_low', 'value'),
+    State('mc_b_high', 'value'),
+    State('mc_dmin_low', 'value'),
+    State('mc_dmin_high', 'value'),
+    State('mc_n', 'value'),
+    State('mc_seed', 'value'),
+    State('mc_job', 'data'),
+    prevent_initial_call=True)
+@metrics.timed("dca_callback_seconds")
+def submit_monte_carlo(n_clicks, qi_low, qi_high, di_low, di_high, b_low, b_high, dmin_low, dmin_high, n, seed, previous):
+    ranges = {"qi": (qi_low, qi_high), "Di": (di_low, di_high), "b": (b_low, b_high), "Dmin": (dmin_low, dmin_high)}
+    error = mc_input_error(ranges, n, seed)
+    if error:
+        return dash.no_update, True, error
+    if previous:
+        jobs.queue.cancel(previous)
+    spec = {
+        "qi": ("lognormal", float(qi_low), float(qi_high)),
+        "di": ("lognormal", float(di_low), float(di_high)),
+        "b": ("uniform", float(b_low), float(b_high)),
+        "dmin": ("uniform", float(decline.nominal_from_effective(float(dmin_low) / 100)),
+                 float(decline.nominal_from_effective(float(dmin_high) / 100))),
+    }
+    job_id = jobs.queue.submit(
+        montecarlo.run_chunk,
+        montecarlo.chunks(spec, int(n), int(seed)),
+        combine=functools.partial(montecarlo.summarize, seed=int(seed)),
+        reduce=montecarlo.merge,
+    )
+    return job_id, False, "Queued."
+
+
+def mc_figure(result):
+    fig = go.Figure(go.Bar(x=(result.edges[:-1] + result.edges[1:]) / 2, y=result.counts, marker_color='orange'))
+    for name in montecarlo.PERCENTILES:
+        fig.add_vline(x=result.summary[name], line_dash='dash', annotation_text=name)
+    fig.update_layout(xaxis_title="EUR (STB)", yaxis_title="Realizations", bargap=0)
+    return fig
+
+
+@app.callback(
+    Output('mc_fig', 'figure'),
+    Output('mc_output', 'children'),
+    Output('mc_progress', 'value'),
+    Output('mc_poll', 'disabled', allow_duplicate=True),
+    Input('mc_poll', 'n_intervals'),
+    Input('mc_cancel', 'n_clicks'),
+    State('mc_job', 'data'),
+    prevent_initial_call=True)
+@metrics.timed("dca_callback_seconds")
+def poll_monte_carlo(n_intervals, cancel_clicks, job_id):
+    if not job_id:
+        raise PreventUpdate
+    if ctx.triggered_id == "mc_cancel":
+        jobs.queue.cancel(job_id)
+    status = jobs.queue.status(job_id)
+    if status is None:
+        return dash.no_update, "Job results have expired; run it again.", 0, True
+    progress = 100 * status["done"] / max(status["total"], 1)
+    if status["state"] in (jobs.QUEUED, jobs.RUNNING):
+        return dash.no_update, f"Running: {status['done']} of {status['total']} chunks", progress, False
+    if status["state"] == jobs.CANCELLED:
+        return dash.no_update, "Cancelled.", progress, True
+    if status["state"] == jobs.FAILED:
+        return dash.no_update, f"Failed: {status['error']}", progress, True
+
+    result = jobs.queue.result(job_id)
+    summary = ", ".join(f"{name} {value:,.0f}" for name, value in result.summary.items())
+    info = f"EUR {summary} STB ({result.n:,} realizations, seed {result.seed})"
+    return mc_figure(result), info, 100, True
+
 if __name__ == "__main__":
     app.run_server(debug=False)
\ No newline at end of file
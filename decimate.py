@@ -0,0 +1,76 @@
+"""
+Shape-preserving downsampling for plotting long series.
+
+``lttb`` (Largest-Triangle-Three-Buckets) keeps the points that carry the
+visual shape of a line. It returns the indices of the points to keep, so x,
+y and any companion arrays can be sliced together.
+"""
+import numpy as np
+
+WEBGL_THRESHOLD = 1000
+DEFAULT_WIDTH = 1000
+
+
+def lttb(x, y, n_out):
+    """Indices of ``n_out`` points chosen by Largest-Triangle-Three-Buckets."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = x.size
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Bucket boundaries over the interior points; first and last are always kept
+    edges = (np.arange(n_out - 1) * (n - 2) / (n_out - 2)).astype(int) + 1
+    edges[-1] = n - 1
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[:-1], edges[:-1]) / counts
+    avg_y = np.add.reduceat(y[:-1], edges[:-1]) / counts
+    # The last bucket looks ahead to the final point
+    avg_x = np.append(avg_x[1:], x[-1])
+    avg_y = np.append(avg_y[1:], y[-1])
+
+    keep = np.empty(n_out, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs(
+            (x[a] - avg_x[i]) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (avg_y[i] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def view_slice(x, x_range=None, pad=1):
+    """Index range of sorted ``x`` inside ``x_range``, plus ``pad`` points each side."""
+    if not x_range:
+        return slice(0, len(x))
+    lo = max(int(np.searchsorted(x, x_range[0])) - pad, 0)
+    hi = int(np.searchsorted(x, x_range[1], side="right")) + pad
+    return slice(lo, hi)
+
+
+def for_plot(x, y, width=DEFAULT_WIDTH, x_range=None):
+    """
+    Points of a line to send to the browser.
+
+    Series that fit in ``width`` pixels are returned whole. Longer ones are
+    cut to ``x_range`` (plus one point either side) and LTTB reduces what is
+    left to about one point per pixel. Returns ``(x, y, trace_type)`` with
+    ``"scattergl"`` when the visible series is long enough to benefit from
+    WebGL.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if x.size > width:
+        view = view_slice(x, x_range)
+        x, y = x[view], y[view]
+    trace_type = "scattergl" if x.size > WEBGL_THRESHOLD else "scatter"
+    if x.size > width:
+        finite = np.isfinite(y)
+        x, y = x[finite], y[finite]
+        keep = lttb(x, y, int(width))
+        x, y = x[keep], y[keep]
+    return x, y, trace_type
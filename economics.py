@@ -0,0 +1,193 @@
+"""
+Monthly cash flow and NPV for many wells at once.
+
+    python economics.py OUT_DIR --price 70 --opex-fixed 1500 --opex-var 4 \
+        --nri 0.8 --discount 0.10
+
+Every price, cost, interest and tax input is a scalar, a per-well array
+(n_wells,), a per-month deck given as a row (1, n_months) (a shorter deck
+is held flat at its last value) or a full (n_wells, n_months) matrix;
+anything else is a ValueError, as is a 1-D input that is not one value per
+well. Inputs broadcast against the (n_wells, n_months) matrix of monthly
+volumes, taken as the differences of the forecast cumulative. Month 0 is
+the first month after each well's last production, so history already
+sold is not counted again. Working interest also scales capex, so it must
+be a scalar or per well.
+Revenue, net cash flow, economic-limit cutoff and discounted NPV are all
+computed as whole-matrix operations. The CLI reads the forecast and fits
+parts a batch.py run wrote to OUT_DIR and adds an economics part next to
+each forecast part.
+
+Prices and variable opex are per unit volume, fixed opex per well-month.
+"""
+import argparse
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+CashFlow = namedtuple("CashFlow", "revenue ncf life npv")
+CashFlow.__doc__ = """\
+``revenue`` and ``ncf`` (net cash flow) are (n_wells, n_months) matrices,
+zero after each well's economic limit; ``life`` is the number of economic
+months per well and ``npv`` the discounted net cash flow less capex."""
+
+
+def _broadcast(name, value, n_wells, n_months):
+    """
+    ``value`` shaped to broadcast against (n_wells, n_months): per-well
+    arrays become columns and short per-month rows are held flat.
+    """
+    value = np.asarray(value, dtype=float)
+    if value.ndim == 0:
+        return value
+    if value.ndim == 1 and value.size == n_wells:
+        return value[:, np.newaxis]
+    if value.ndim == 2 and value.shape[0] == 1 and value.shape[1] > 0:
+        if value.shape[1] < n_months:
+            value = np.append(value, np.full((1, n_months - value.shape[1]), value[0, -1]), axis=1)
+        return value[:, :n_months]
+    if value.ndim == 2 and value.shape in ((n_wells, 1), (n_wells, n_months)):
+        return value
+    raise ValueError(
+        f"{name} must be a scalar, ({n_wells},) per well, (1, months) per month "
+        f"or ({n_wells}, {n_months}), not {value.shape}"
+    )
+
+
+def _per_well(name, value):
+    """A scalar or per-well column from ``_broadcast`` as a scalar or (n_wells,) array."""
+    if value.ndim == 0:
+        return value
+    if value.shape[1] == 1:
+        return value[:, 0]
+    raise ValueError(f"{name} must be a scalar or per well, not a per-month deck")
+
+
+def discount_factors(n_months, rate):
+    """Mid-month discount factors for an effective annual ``rate``."""
+    return (1.0 + rate) ** (-(np.arange(n_months) + 0.5) / 12.0)
+
+
+def economic_life(ncf):
+    """
+    Months until the first month with non-positive net cash flow, per well.
+
+    Wells that never go negative keep the full forecast.
+    """
+    negative = ncf <= 0
+    return np.where(negative.any(axis=1), negative.argmax(axis=1), ncf.shape[1])
+
+
+def _cash_flow(volume, price, opex_fixed, opex_var, nri, wi, tax, discount, capex):
+    n_wells, n_months = volume.shape
+    price, opex_fixed, opex_var, nri, wi, tax = (
+        _broadcast(name, value, n_wells, n_months)
+        for name, value in (("price", price), ("opex_fixed", opex_fixed), ("opex_var", opex_var),
+                            ("nri", nri), ("wi", wi), ("tax", tax))
+    )
+    revenue = volume * price * nri
+    costs = wi * (opex_fixed + opex_var * volume)
+    ncf = revenue * (1.0 - tax) - costs
+    life = economic_life(ncf)
+    live = np.arange(n_months) < life[:, np.newaxis]
+    ncf = np.where(live, ncf, 0.0)
+    revenue = np.where(live, revenue, 0.0)
+    # Capex is spent once per well, so only per-well working interest applies
+    capex = np.asarray(capex, dtype=float) * _per_well("wi", wi)
+    npv = ncf @ discount_factors(n_months, discount) - capex
+    return CashFlow(revenue, ncf, life, npv)
+
+
+def monthly_volume(cum):
+    """
+    Volume produced in each month from a cumulative matrix sampled at month
+    starts; one month shorter than ``cum``, with missing months as zero.
+    """
+    return np.nan_to_num(np.diff(np.asarray(cum, dtype=float), axis=1))
+
+
+def cash_flow(volume, price, opex_fixed=0.0, opex_var=0.0, nri=0.875, wi=1.0, tax=0.0,
+              discount=0.10, capex=0.0):
+    """
+    Cash flow for a (n_wells, n_months) matrix of monthly volumes.
+
+    ``nri`` scales revenue and ``wi`` scales costs; ``tax`` is a severance
+    fraction of revenue; ``capex`` is spent at time zero.
+    """
+    volume = np.asarray(volume, dtype=float)
+    return _cash_flow(volume, price, opex_fixed, opex_var, nri, wi, tax, discount, capex)
+
+
+def npv_sensitivity(volume, price_decks, **kwargs):
+    """
+    NPV of every well under each price deck, shape (n_decks, n_wells).
+    Each deck is a scalar price or a 1-D monthly deck.
+    """
+    volume = np.asarray(volume, dtype=float)
+    options = dict(opex_fixed=0.0, opex_var=0.0, nri=0.875, wi=1.0, tax=0.0, discount=0.10, capex=0.0)
+    options.update(kwargs)
+    decks = [np.asarray(deck, dtype=float) for deck in price_decks]
+    return np.stack([_cash_flow(volume, deck if deck.ndim == 0 else deck.reshape(1, -1), **options).npv
+                     for deck in decks])
+
+
+def forecast_matrix(df, t_last=None):
+    """
+    Pivot a long batch forecast (API, Month, Cum) into APIs and a matrix of
+    future monthly volumes.
+
+    ``t_last`` maps API to the last producing month (the fits' ``t_last``);
+    forecast months up to and including it are history and are dropped.
+    """
+    if t_last is not None:
+        last = df["API"].map(t_last).fillna(-1).to_numpy()
+        df = df[df["Month"].to_numpy() > last]
+    df = df.sort_values(["API", "Month"])
+    apis, starts, counts = np.unique(df["API"].to_numpy(), return_index=True, return_counts=True)
+    cum = np.full((len(apis), counts.max(initial=0)), np.nan)
+    cols = np.arange(len(df)) - np.repeat(starts, counts)
+    cum[np.repeat(np.arange(len(apis)), counts), cols] = df["Cum"].to_numpy()
+    return apis, monthly_volume(cum)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cash flow and NPV for the forecasts of a batch.py run.")
+    parser.add_argument("out_dir", help="output directory of a batch.py run")
+    parser.add_argument("--price", type=float, nargs="+", required=True,
+                        help="price per unit volume; several values form a monthly deck")
+    parser.add_argument("--opex-fixed", type=float, default=0.0, help="fixed cost per well-month")
+    parser.add_argument("--opex-var", type=float, default=0.0, help="variable cost per unit volume")
+    parser.add_argument("--nri", type=float, default=0.875, help="net revenue interest")
+    parser.add_argument("--wi", type=float, default=1.0, help="working interest")
+    parser.add_argument("--tax", type=float, default=0.0, help="severance tax fraction")
+    parser.add_argument("--discount", type=float, default=0.10, help="annual discount rate")
+    parser.add_argument("--capex", type=float, default=0.0, help="capital cost per well at time zero")
+    args = parser.parse_args(argv)
+
+    price = args.price[0] if len(args.price) == 1 else np.array([args.price])
+    for name in sorted(os.listdir(args.out_dir)):
+        stem, ext = os.path.splitext(name)
+        if not stem.startswith("forecast-") or ext not in (".csv", ".parquet"):
+            continue
+        path = os.path.join(args.out_dir, name)
+        df = pd.read_parquet(path) if ext == ".parquet" else pd.read_csv(path, dtype={"API": str})
+        fits = pd.read_csv(os.path.join(args.out_dir, stem.replace("forecast-", "fits-") + ".csv"),
+                           dtype={"API": str}, usecols=["API", "t_last"])
+        apis, volume = forecast_matrix(df, fits.set_index("API")["t_last"])
+        cf = cash_flow(volume, price, args.opex_fixed, args.opex_var, args.nri, args.wi, args.tax,
+                       args.discount, args.capex)
+        result = pd.DataFrame({
+            "API": apis,
+            "Life Months": cf.life,
+            "Revenue": cf.revenue.sum(axis=1),
+            "Net Cash Flow": cf.ncf.sum(axis=1),
+            "NPV": cf.npv,
+        })
+        result.to_csv(os.path.join(args.out_dir, stem.replace("forecast-", "economics-") + ".csv"), index=False)
+        print(f"{name}: {len(apis)} wells, NPV {cf.npv.sum():,.0f}")
+
+
+if __name__ == "__main__":
+    main()
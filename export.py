@@ -0,0 +1,199 @@
+"""
+Streaming forecast export.
+
+    python export.py FITS OUT [--format csv|parquet|aries] [--months 600]
+
+FITS is a fits CSV, or a batch.py (or refit.py) output directory, whose
+completed ``fits-NNNNN.csv`` parts are read; OUT is a file, or ``-`` for
+stdout.
+Fits are read and forecast a chunk of wells at a time and each chunk is
+written out before the next is computed, so a portfolio of 50-year monthly
+forecasts never sits in memory at once. The dashboard serves the same
+generator over HTTP.
+
+Formats:
+
+* ``csv`` / ``parquet``: API, Month, Rate (per day), Cum (volume), plus the
+  well's qi, Di, b, t0, t_last and LastMonth on every row. Parquet needs
+  pyarrow (see ``parquet_available``).
+* ``aries``: the AC_PRODUCT import table used by reserves software:
+  PROPNUM, P_DATE (first of month) and the monthly volume of the forecast
+  phase in an OIL, GAS or WATER column. Only months after each well's last
+  production are written, dated on from the LastMonth of its fit, and
+  volumes are the month-to-month differences of the forecast cumulative.
+  Wells need ``MM/YYYY`` source months for that date; an export with a
+  future month of an undated well fails rather than guess one.
+"""
+import argparse
+import importlib.util
+import io
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import batch
+import fitting
+import loader
+
+FORMATS = ("csv", "parquet", "aries")
+CHUNK_WELLS = 200
+MONTHS = 600
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "aries": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+EXTENSIONS = {"csv": "csv", "aries": "csv", "parquet": "parquet"}
+
+
+def read_fits(path, chunk_wells=CHUNK_WELLS):
+    """
+    ``(apis, fits, last_months)`` chunks from a fits CSV or a batch output
+    directory, read ``chunk_wells`` rows at a time; wells without a
+    LastMonth get an empty one.
+    """
+    if os.path.isdir(path):
+        checkpoint = batch.Checkpoint(path)
+        paths = [checkpoint.part(chunk, "fits", "csv") for chunk in sorted(checkpoint.chunks)]
+    else:
+        paths = [path]
+    for p in paths:
+        for df in pd.read_csv(p, dtype={"API": str, "LastMonth": str}, chunksize=chunk_wells):
+            last = df["LastMonth"].fillna("") if "LastMonth" in df.columns else [""] * len(df)
+            yield df["API"].tolist(), fitting.fits_from_frame(df), list(last)
+
+
+def forecast_chunks(fit_chunks, months=MONTHS):
+    """Forecast frame with per-well parameters for each ``(apis, fits, last_months)`` chunk."""
+    for apis, fits, last in fit_chunks:
+        frame = batch.forecast_frame(apis, fits, months)
+        if frame.empty:
+            continue
+        ok = [i for i, f in enumerate(fits) if f.success]
+        for field in ("qi", "di", "b", "t0", "t_last"):
+            frame[field] = np.repeat([getattr(fits[i], field) for i in ok], months)
+        frame["LastMonth"] = np.repeat([last[i] for i in ok], months)
+        yield frame
+
+
+def aries_frame(frame, phase="Oil"):
+    """
+    AC_PRODUCT rows (PROPNUM, P_DATE, OIL/GAS/WATER volume) for the future
+    months of a forecast frame, dated from each well's LastMonth. Raises
+    ValueError when a well with future months has no LastMonth.
+    """
+    apis = frame["API"].to_numpy()
+    cum = frame["Cum"].to_numpy(dtype=float)
+    # Volume of each month is the Cum at the next month's start less its own;
+    # the last month of each well has no next row and is left out
+    volume = np.full(cum.shape, np.nan)
+    same_well = apis[1:] == apis[:-1]
+    volume[:-1] = np.where(same_well, cum[1:] - cum[:-1], np.nan)
+    month = frame["Month"].to_numpy(dtype=float)
+    last = frame["t_last"].to_numpy(dtype=float)
+    keep = (month > last) & ~np.isnan(volume)
+    dated = frame["LastMonth"].to_numpy(dtype=object)[keep]
+    undated = pd.unique(apis[keep][dated == ""])
+    if len(undated):
+        raise ValueError(
+            f"{len(undated)} wells have no dated production (MM/YYYY months) to date ARIES rows from, "
+            f"e.g. {', '.join(undated[:3])}"
+        )
+    offset = (month[keep] - last[keep]).astype(int)
+    out = pd.DataFrame({
+        "PROPNUM": apis[keep],
+        "P_DATE": (dated.astype("datetime64[M]") + offset).astype("datetime64[D]"),
+    })
+    for p in loader.PHASES:
+        out[p.upper()] = volume[keep] if p == phase else np.nan
+    return out
+
+
+def _csv_parts(frames):
+    header = True
+    for frame in frames:
+        yield frame.to_csv(index=False, header=header, date_format="%m/%d/%Y")
+        header = False
+
+
+def parquet_available():
+    """True when pyarrow can be imported for Parquet output."""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _parquet_parts(frames):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export requires pyarrow: pip install pyarrow")
+    buffer = io.BytesIO()
+    writer = None
+    for frame in frames:
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(buffer, table.schema)
+        writer.write_table(table)
+        # Hand over each row group as soon as it is written
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if writer is not None:
+        writer.close()
+        yield buffer.getvalue()
+
+
+def stream(frames, fmt="csv", phase="Oil"):
+    """
+    Encoded export of forecast ``frames``, one piece per chunk: ``str`` for
+    the CSV formats, ``bytes`` for Parquet.
+    """
+    if fmt == "csv":
+        return _csv_parts(frames)
+    if fmt == "aries":
+        return _csv_parts(aries_frame(f, phase) for f in frames)
+    if fmt == "parquet":
+        return _parquet_parts(frames)
+    raise ValueError(f"format must be one of {', '.join(FORMATS)}, not {fmt!r}")
+
+
+def write(frames, out, fmt="csv", phase="Oil"):
+    """Stream an export to the open file ``out`` (text mode for CSV, binary for Parquet)."""
+    for part in stream(frames, fmt, phase):
+        out.write(part)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export forecasts for fit wells, one chunk at a time.")
+    parser.add_argument("fits", help="fits CSV or batch.py output directory")
+    parser.add_argument("out", help="output file, or - for stdout")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--months", type=int, default=MONTHS, help="forecast length in months")
+    parser.add_argument("--phase", choices=loader.PHASES, default="Oil", help="phase the fits are for (aries layout)")
+    parser.add_argument("--chunk-wells", type=int, default=CHUNK_WELLS)
+    args = parser.parse_args(argv)
+
+    frames = forecast_chunks(read_fits(args.fits, args.chunk_wells), args.months)
+    binary = args.format == "parquet"
+    if args.out == "-":
+        out = sys.stdout.buffer if binary else sys.stdout
+        try:
+            write(frames, out, args.format, args.phase)
+        except (RuntimeError, ValueError) as error:
+            sys.exit(str(error))
+        return
+    tmp = args.out + ".tmp"
+    try:
+        with open(tmp, "wb" if binary else "w", newline="" if not binary else None) as out:
+            write(frames, out, args.format, args.phase)
+    except (RuntimeError, ValueError) as error:
+        os.remove(tmp)
+        sys.exit(str(error))
+    os.replace(tmp, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Least-squares Arps fits of qi, Di and b from production history.
+
+A well's history is fit in log-rate space with analytic residuals and
+Jacobian evaluated over all of its months at once. ``fit_wells`` spreads a
+portfolio over a process pool.
+"""
+import hashlib
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.optimize import least_squares
+
+B_BOUNDS = (0.0, 2.0)
+MIN_POINTS = 3
+B_EPS = 1e-6
+
+FitResult = namedtuple("FitResult", "qi di b t0 rmse n success t_last")
+FitResult.__doc__ = """\
+Fitted Arps parameters. ``t0`` is the month index the curve starts at
+(the peak month when peak alignment is on), ``rmse`` is in log-rate units,
+``n`` is the number of points used and ``t_last`` the month index of the
+last producing month, after which the forecast is future production."""
+
+FAILED = FitResult(np.nan, np.nan, np.nan, 0, np.nan, 0, False, -1)
+
+
+def history_hash(rates, **settings):
+    """Content hash of a rate history together with the settings it is fit with."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.ascontiguousarray(rates, dtype=float).tobytes())
+    h.update(repr(sorted(settings.items())).encode())
+    return h.hexdigest()
+
+
+def fits_from_frame(df):
+    """FitResults from the rows of a fits table such as batch.py writes."""
+    df = df.reindex(columns=FitResult._fields)
+    df["t_last"] = df["t_last"].fillna(-1)
+    return [
+        FitResult(float(qi), float(di), float(b), int(t0), float(rmse), int(n), bool(success), int(t_last))
+        for qi, di, b, t0, rmse, n, success, t_last in df.itertuples(index=False, name=None)
+    ]
+
+
+def log_rate(params, t):
+    """Natural log of the Arps rate at times t for params (qi, di, b)."""
+    qi, di, b = params
+    if b < B_EPS:
+        return np.log(qi) - di * t
+    return np.log(qi) - np.log1p(b * di * t) / b
+
+
+def jacobian(params, t):
+    """d log(q) / d(qi, di, b) at times t, shape (len(t), 3)."""
+    qi, di, b = params
+    jac = np.empty((t.size, 3))
+    jac[:, 0] = 1 / qi
+    if b < B_EPS:
+        jac[:, 1] = -t
+        jac[:, 2] = 0.5 * (di * t) ** 2
+    else:
+        x = b * di * t
+        jac[:, 1] = -t / (1 + x)
+        jac[:, 2] = np.log1p(x) / b ** 2 - di * t / (b * (1 + x))
+    return jac
+
+
+def prepare_history(rates, align_peak=True):
+    """
+    Times and rates to fit from a monthly rate series.
+
+    Non-positive and missing months are dropped. With ``align_peak`` the
+    series starts at its peak month, which becomes t = 0. Returns
+    ``(t, q, t0)``.
+    """
+    rates = np.asarray(rates, dtype=float)
+    months = np.arange(rates.size, dtype=float)
+    valid = np.isfinite(rates) & (rates > 0)
+    if not valid.any():
+        return months[:0], rates[:0], 0
+    t0 = int(np.nanargmax(np.where(valid, rates, np.nan))) if align_peak else int(np.argmax(valid))
+    keep = valid & (months >= t0)
+    return months[keep] - t0, rates[keep], t0
+
+
+def initial_guess(t, q, b_bounds=B_BOUNDS):
+    """Exponential log-linear fit for qi and Di, with b mid-range."""
+    slope, intercept = np.polyfit(t, np.log(q), 1)
+    di = max(-slope, 1e-4)
+    b = np.clip(0.5, *b_bounds)
+    return np.array([max(np.exp(intercept), q.max()), di, b])
+
+
+def fit_arps(rates, b_bounds=B_BOUNDS, align_peak=True, x0=None):
+    """
+    Fit qi, Di and b to a monthly rate series.
+
+    ``b_bounds`` limits the b-value; qi and Di are kept positive. Pass a
+    previous fit's ``(qi, di, b)`` as ``x0`` to warm-start the solver.
+    """
+    t, q, t0 = prepare_history(rates, align_peak)
+    t_last = int(t0 + t[-1]) if t.size else -1
+    if q.size < MIN_POINTS:
+        return FAILED._replace(t0=t0, n=int(q.size), t_last=t_last)
+
+    log_q = np.log(q)
+    lower = [1e-9, 1e-9, b_bounds[0]]
+    upper = [np.inf, np.inf, b_bounds[1]]
+    if x0 is None or not np.all(np.isfinite(x0)):
+        x0 = initial_guess(t, q, b_bounds)
+    x0 = np.clip(np.asarray(x0, dtype=float), lower, [1e12, 1e3, b_bounds[1]])
+
+    sol = least_squares(
+        lambda p: log_rate(p, t) - log_q,
+        x0,
+        jac=lambda p: jacobian(p, t),
+        bounds=(lower, upper),
+        x_scale="jac",
+    )
+    qi, di, b = sol.x
+    rmse = float(np.sqrt(np.mean(sol.fun ** 2)))
+    return FitResult(float(qi), float(di), float(b), t0, rmse, int(q.size), bool(sol.success), t_last)
+
+
+def _fit_one(args):
+    rates, kwargs = args
+    return fit_arps(rates, **kwargs)
+
+
+def fit_wells(histories, processes=None, chunksize=64, **kwargs):
+    """
+    Fit many wells, returning a list of FitResult in input order.
+
+    ``histories`` is an iterable of monthly rate arrays. With ``processes``
+    other than 1 the fits run on a process pool (default: one worker per
+    CPU); remaining keyword arguments are passed to ``fit_arps``.
+    """
+    jobs = [(np.asarray(h, dtype=float), kwargs) for h in histories]
+    if processes == 1 or len(jobs) < 2 * chunksize:
+        return [_fit_one(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=processes or os.cpu_count()) as pool:
+        return list(pool.map(_fit_one, jobs, chunksize=chunksize))
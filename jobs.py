@@ -0,0 +1,177 @@
+"""
+Background jobs for the dashboard.
+
+Long analyses are split into independent chunks and run on a small process
+pool owned by this module, so a callback only submits work and returns a
+job id. Later callbacks poll ``status`` for progress, ``cancel`` pending
+chunks, and read the combined result from an LRU of finished jobs.
+
+The pool is capped at ``DCA_JOB_WORKERS`` processes (half the CPUs by
+default) and its workers run at a lower scheduling priority, so heavy jobs
+leave headroom for interactive requests on the same server. Like the table
+store, jobs live in one process; run gunicorn with a single worker (the
+Procfile default) or pin a session to its worker.
+"""
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+MAX_RESULTS = 32
+NICENESS = 10
+
+
+def default_workers():
+    return int(os.environ.get("DCA_JOB_WORKERS") or max(1, (os.cpu_count() or 2) // 2))
+
+
+def _lower_priority():
+    if hasattr(os, "nice"):
+        os.nice(NICENESS)
+
+
+class Job:
+    """One submitted job: its chunk futures and, once finished, its result."""
+
+    def __init__(self, n_chunks, combine, reduce=None):
+        self.id = uuid.uuid4().hex
+        self.total = n_chunks
+        self.done = 0
+        self.state = QUEUED
+        self.result = None
+        self.error = None
+        self.combine = combine
+        self.reduce = reduce
+        self.parts = None if reduce else [None] * n_chunks
+        self.futures = []
+
+    def status(self):
+        return {"id": self.id, "state": self.state, "done": self.done, "total": self.total, "error": self.error}
+
+
+class JobQueue:
+    """Process-pool job runner with progress, cancellation and a result cache."""
+
+    def __init__(self, max_workers=None, max_results=MAX_RESULTS):
+        self.max_workers = max_workers or default_workers()
+        self.max_results = max_results
+        self._pool = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_lower_priority)
+            return self._pool
+
+    def submit(self, fn, chunks, combine=list, reduce=None):
+        """
+        Run ``fn(chunk)`` for every chunk in the pool and return a job id.
+
+        ``combine`` turns the list of chunk results (in chunk order) into the
+        job's result; it runs in this process once the last chunk finishes.
+        With ``reduce``, chunk results are instead folded into one value as
+        they arrive, ``reduce(value, part)`` in completion order, and
+        ``combine`` gets that value; only the running value is kept.
+        """
+        chunks = list(chunks)
+        job = Job(len(chunks), combine, reduce)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict()
+        if not chunks:
+            self._finish(job)
+            return job.id
+        for i, chunk in enumerate(chunks):
+            future = self.pool.submit(fn, chunk)
+            job.futures.append(future)
+            future.add_done_callback(lambda f, i=i: self._chunk_done(job, i, f))
+        return job.id
+
+    def _chunk_done(self, job, i, future):
+        with self._lock:
+            if job.state in (FAILED, CANCELLED) or future.cancelled():
+                return
+            error = future.exception()
+            if error is not None:
+                job.state = FAILED
+                job.error = f"{type(error).__name__}: {error}"
+                cancel = job.futures
+            else:
+                part = future.result()
+                if job.reduce is None:
+                    job.parts[i] = part
+                else:
+                    job.parts = part if job.parts is None else job.reduce(job.parts, part)
+                job.done += 1
+                job.state = RUNNING
+                cancel = None
+            finished = job.done == job.total
+        if cancel:
+            for f in cancel:
+                f.cancel()
+        if finished:
+            self._finish(job)
+
+    def _finish(self, job):
+        try:
+            result = job.combine(job.parts)
+        except Exception as error:
+            with self._lock:
+                job.state = FAILED
+                job.error = f"{type(error).__name__}: {error}"
+            return
+        with self._lock:
+            job.result = result
+            job.parts = None
+            job.state = DONE
+
+    def _evict(self):
+        # Drop the oldest finished jobs; running ones are never evicted
+        finished = [k for k, j in self._jobs.items() if j.state in (DONE, FAILED, CANCELLED)]
+        for key in finished[:max(0, len(self._jobs) - self.max_results)]:
+            del self._jobs[key]
+
+    def _get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id):
+        """Progress of a job as a dict, or None for an unknown or evicted id."""
+        job = self._get(job_id)
+        if job is None:
+            return None
+        with self._lock:
+            return job.status()
+
+    def result(self, job_id):
+        """Combined result of a finished job, otherwise None."""
+        job = self._get(job_id)
+        return job.result if job is not None and job.state == DONE else None
+
+    def cancel(self, job_id):
+        """Cancel the chunks of a job that have not started; returns its status."""
+        job = self._get(job_id)
+        if job is None:
+            return None
+        with self._lock:
+            if job.state not in (QUEUED, RUNNING):
+                return job.status()
+            job.state = CANCELLED
+            job.parts = None
+            futures = list(job.futures)
+        for future in futures:
+            future.cancel()
+        return self.status(job_id)
+
+
+queue = JobQueue()
@@ -0,0 +1,145 @@
+"""
+Production data loader.
+
+Each well file (``<API>.csv`` with Month,Oil,Gas[,Water] columns in monthly
+volumes) is parsed once into daily-rate float arrays and kept in an LRU
+cache keyed by API number and file mtime. Editing a file on disk changes its
+mtime, so the next load re-parses it; everything else is served from memory.
+Unreported months (``-``) load as NaN; see cleaning.py for what happens to
+them before fitting.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+import metrics
+from decline import DAYS_PER_MONTH
+
+PHASES = ("Oil", "Gas", "Water")
+
+MAX_ENTRIES = 512
+MAX_BYTES = 64 * 1024 * 1024
+
+
+class WellData:
+    """Daily rates for one well. Phases missing from the file are None."""
+
+    __slots__ = ("api", "oil", "gas", "water")
+
+    def __init__(self, api, oil=None, gas=None, water=None):
+        self.api = api
+        self.oil = oil
+        self.gas = gas
+        self.water = water
+
+    def __len__(self):
+        return max((len(a) for a in self.phases().values()), default=0)
+
+    def phases(self):
+        """Present phases as an ordered {name: array} dict."""
+        arrays = {"Oil": self.oil, "Gas": self.gas, "Water": self.water}
+        return {k: v for k, v in arrays.items() if v is not None}
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in self.phases().values())
+
+
+def api_from_path(path):
+    """API number is the file name without its extension."""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def well_from_frame(df, api=None):
+    """Convert a frame of monthly volumes into a WellData of daily rates."""
+    arrays = {}
+    for phase in PHASES:
+        if phase in df.columns:
+            values = pd.to_numeric(df[phase], errors="coerce")
+            arrays[phase.lower()] = values.to_numpy(dtype=float) / DAYS_PER_MONTH
+    return WellData(api, **arrays)
+
+
+def list_csvs(directory):
+    """Paths of the well CSVs in ``directory``, sorted by API number."""
+    with os.scandir(directory) as entries:
+        paths = [e.path for e in entries if e.is_file() and e.name.lower().endswith(".csv")]
+    return sorted(paths)
+
+
+def read_frame(path):
+    """Raw Month/phase columns of a well CSV, as strings."""
+    return pd.read_csv(path, usecols=lambda c: c == "Month" or c in PHASES, dtype=str)
+
+
+def parse_csv(path):
+    """Read a well CSV from disk, bypassing the cache."""
+    return well_from_frame(read_frame(path), api_from_path(path))
+
+
+class WellCache:
+    """
+    Thread-safe LRU cache of parsed wells.
+
+    Entries are evicted oldest-first once either ``max_entries`` or
+    ``max_bytes`` (the summed size of the cached arrays) is exceeded.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load(self, path):
+        api = api_from_path(path)
+        mtime = os.stat(path).st_mtime_ns
+        with self._lock:
+            entry = self._entries.get(api)
+            if entry is not None and entry[0] == mtime:
+                self._entries.move_to_end(api)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        with metrics.timer("dca_stage_seconds", "csv_load"):
+            well = parse_csv(path)
+        for array in well.phases().values():
+            array.setflags(write=False)
+
+        with self._lock:
+            old = self._entries.pop(api, None)
+            if old is not None:
+                self.nbytes -= old[1].nbytes
+            self._entries[api] = (mtime, well)
+            self.nbytes += well.nbytes
+            self._evict()
+        return well
+
+    def _evict(self):
+        while self._entries and (
+            len(self._entries) > self.max_entries or self.nbytes > self.max_bytes
+        ):
+            _, (_, well) = self._entries.popitem(last=False)
+            self.nbytes -= well.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+
+cache = WellCache()
+
+
+def load_well(path):
+    """Parsed daily rates for the well file at ``path``, cached."""
+    return cache.load(path)
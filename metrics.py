@@ -0,0 +1,134 @@
+"""
+In-process latency metrics.
+
+Timings are collected into histograms keyed by metric and label and served
+in Prometheus text format by ``register(server)`` at ``/metrics``. Each
+gunicorn worker keeps its own numbers; scrape every worker or run one.
+"""
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "dca_callback_seconds": "Time spent inside each Dash callback.",
+    "dca_stage_seconds": "Time spent in a stage of the work: csv_load, fit.",
+    "dca_request_seconds": "Callback request time including JSON serialization, by output.",
+}
+
+
+class Histogram:
+    """Cumulative-bucket histogram of durations in seconds."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += seconds
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+_histograms = {}
+_lock = threading.Lock()
+
+
+def histogram(metric, label):
+    key = (metric, label)
+    hist = _histograms.get(key)
+    if hist is None:
+        with _lock:
+            hist = _histograms.setdefault(key, Histogram())
+    return hist
+
+
+def observe(metric, label, seconds):
+    histogram(metric, label).observe(seconds)
+
+
+@contextmanager
+def timer(metric, label):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(metric, label, time.perf_counter() - start)
+
+
+def timed(metric, label=None):
+    """Decorator recording each call's duration, labelled by function name by default."""
+    def decorator(func):
+        name = label or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(metric, name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _label_name(metric):
+    return {"dca_callback_seconds": "callback", "dca_stage_seconds": "stage"}.get(metric, "output")
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render():
+    """All histograms in Prometheus text exposition format."""
+    with _lock:
+        items = sorted(_histograms.items())
+    lines = []
+    seen = set()
+    for (metric, label), hist in items:
+        if metric not in seen:
+            seen.add(metric)
+            lines.append(f"# HELP {metric} {HELP.get(metric, metric)}")
+            lines.append(f"# TYPE {metric} histogram")
+        counts, total, count = hist.snapshot()
+        tag = f'{_label_name(metric)}="{_escape(label)}"'
+        cumulative = 0
+        for bound, n in zip(hist.buckets, counts):
+            cumulative += n
+            lines.append(f'{metric}_bucket{{{tag},le="{bound}"}} {cumulative}')
+        lines.append(f'{metric}_bucket{{{tag},le="+Inf"}} {count}')
+        lines.append(f"{metric}_sum{{{tag}}} {total}")
+        lines.append(f"{metric}_count{{{tag}}} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def register(server, path="/metrics"):
+    """Time Dash callback requests on ``server`` and expose the metrics at ``path``."""
+    from flask import Response, g, request
+
+    @server.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @server.after_request
+    def _record_request(response):
+        start = g.pop("metrics_start", None)
+        if start is not None and request.path.endswith("_dash-update-component"):
+            body = request.get_json(silent=True) or {}
+            output = body.get("output", "unknown").split("@")[0]
+            observe("dca_request_seconds", output, time.perf_counter() - start)
+        return response
+
+    @server.route(path)
+    def _metrics():
+        return Response(render(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,234 @@
+"""
+Probabilistic EUR by Monte Carlo.
+
+    python montecarlo.py --qi 150 400 --di 0.1 0.3 --b 0.5 1.2 --dmin 0.06 \
+        --n 1000000 --seed 7 --out eur_hist.csv
+
+Realizations of (qi, Di, b, Dmin) are drawn in fixed-size chunks and their
+modified-hyperbolic EUR is evaluated in closed form. Each chunk is reduced
+to a fine log-spaced histogram (``Tally``) and tallies are added up as they
+arrive, so memory depends on the chunk size rather than the realization
+count or forecast length; percentiles are read off the cumulative histogram.
+Each chunk draws from its own child of one ``SeedSequence``, which makes a
+run reproducible from its seed no matter how many processes evaluate it.
+
+Units follow the dashboard: qi and the economic limit in volume/day, Di and
+Dmin nominal per month, EUR in volume.
+"""
+import argparse
+import functools
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import decline
+
+CHUNK_SIZE = 10000
+MONTHS = 600
+BINS = 50
+PERCENTILES = {"P10": 90.0, "P50": 50.0, "P90": 10.0}
+PARAMS = ("qi", "di", "b", "dmin")
+
+# Tally bins: BINS_PER_DECADE log-spaced bins from 10**LOG_MIN to 10**LOG_MAX
+# volume, plus one below (including zero) and one above. Percentiles come
+# out within a fraction of a bin width (about 0.6%) of the exact ones.
+LOG_MIN = 0
+LOG_MAX = 10
+BINS_PER_DECADE = 400
+TALLY_EDGES = np.logspace(LOG_MIN, LOG_MAX, BINS_PER_DECADE * (LOG_MAX - LOG_MIN) + 1)
+
+Tally = namedtuple("Tally", "counts n total low high")
+Tally.__doc__ = """\
+Running summary of EUR realizations: ``counts`` over the tally bins, how
+many there were, their sum and their smallest and largest values."""
+
+MonteCarloResult = namedtuple("MonteCarloResult", "n summary counts edges seed")
+MonteCarloResult.__doc__ = """\
+``n`` is the number of realizations, ``summary`` maps P10/P50/P90/Mean to
+EUR, ``counts``/``edges`` are the histogram and ``seed`` the seed used."""
+
+
+def sample(dist, size, rng):
+    """
+    Draw ``size`` values from a distribution spec.
+
+    Specs are tuples: ``("fixed", v)``, ``("uniform", low, high)``,
+    ``("normal", mean, sd)``, ``("triangular", low, mode, high)`` or
+    ``("lognormal", p90, p10)`` given by its low and high case values.
+    A bare number is treated as fixed.
+    """
+    if np.isscalar(dist):
+        dist = ("fixed", dist)
+    kind, *args = dist
+    if kind == "fixed":
+        return np.full(size, float(args[0]))
+    if kind == "uniform":
+        return rng.uniform(args[0], args[1], size)
+    if kind == "normal":
+        return rng.normal(args[0], args[1], size)
+    if kind == "triangular":
+        return rng.triangular(args[0], args[1], args[2], size)
+    if kind == "lognormal":
+        low, high = np.log(args[0]), np.log(args[1])
+        # P90 and P10 sit 1.2816 standard deviations either side of the median
+        return rng.lognormal((low + high) / 2, (high - low) / (2 * 1.2815516), size)
+    raise ValueError(f"unknown distribution {kind!r}")
+
+
+def draw(spec, size, rng):
+    """Sampled (qi, di, b, dmin) arrays, clipped to physical ranges."""
+    qi, di, b, dmin = (sample(spec.get(p, 0.0), size, rng) for p in PARAMS)
+    return (
+        np.clip(qi, 0.0, None),
+        np.clip(di, 1e-9, None),
+        np.clip(b, 0.0, None),
+        np.clip(dmin, 0.0, None),
+    )
+
+
+def eur(qi, di, b, dmin, months=MONTHS, q_limit=0.0):
+    """
+    EUR of each realization: cumulative volume out to ``months`` or until
+    the rate drops below ``q_limit``, whichever comes first.
+    """
+    return decline.eur(qi, di, b, dmin, q_limit, t_max=months) * decline.DAYS_PER_MONTH
+
+
+def tally(values):
+    """``Tally`` of an array of EUR values; NaNs are left out."""
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    with np.errstate(divide="ignore"):
+        position = (np.log10(values) - LOG_MIN) * BINS_PER_DECADE
+    bins = np.clip(position, -1, TALLY_EDGES.size - 1).astype(np.int64) + 1
+    bins[position < 0] = 0
+    counts = np.bincount(bins, minlength=TALLY_EDGES.size + 1)
+    if not values.size:
+        return Tally(counts, 0, 0.0, np.inf, -np.inf)
+    return Tally(counts, values.size, float(values.sum()), float(values.min()), float(values.max()))
+
+
+def merge(a, b):
+    """Combined ``Tally`` of two."""
+    return Tally(a.counts + b.counts, a.n + b.n, a.total + b.total, min(a.low, b.low), max(a.high, b.high))
+
+
+def run_chunk(args):
+    """``Tally`` of the EUR of one chunk from ``chunks``."""
+    spec, size, seed, months, q_limit = args
+    rng = np.random.default_rng(seed)
+    return tally(eur(*draw(spec, size, rng), months=months, q_limit=q_limit))
+
+
+def chunks(spec, n, seed=0, chunk_size=CHUNK_SIZE, months=MONTHS, q_limit=0.0):
+    """
+    Arguments for ``run_chunk`` covering ``n`` realizations, each chunk
+    with its own child seed.
+    """
+    sizes = [chunk_size] * (n // chunk_size)
+    if n % chunk_size:
+        sizes.append(n % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    return [(spec, size, s, months, q_limit) for size, s in zip(sizes, seeds)]
+
+
+def simulate(spec, n, seed=0, chunk_size=CHUNK_SIZE, months=MONTHS, q_limit=0.0,
+             bins=BINS, processes=None):
+    """
+    Run ``n`` realizations of ``spec`` (a {param: distribution} dict over
+    qi, di, b and dmin) and summarize their EUR.
+
+    With ``processes`` other than 1 chunks are spread over a process pool.
+    """
+    jobs = chunks(spec, n, seed, chunk_size, months, q_limit)
+    if processes == 1 or len(jobs) == 1:
+        total = functools.reduce(merge, map(run_chunk, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=processes or os.cpu_count()) as pool:
+            total = functools.reduce(merge, pool.map(run_chunk, jobs))
+    return summarize(total, bins, seed)
+
+
+def percentile(t, q):
+    """``q``-th percentile of a ``Tally``, interpolated log-linearly inside its bin."""
+    cumulative = np.cumsum(t.counts)
+    rank = q / 100 * t.n
+    i = min(int(np.searchsorted(cumulative, rank)), t.counts.size - 1)
+    below = cumulative[i] - t.counts[i]
+    frac = (rank - below) / t.counts[i] if t.counts[i] else 0.0
+    # Bin i spans TALLY_EDGES[i - 1]..TALLY_EDGES[i]; the outer bins are bounded by low and high
+    lo = TALLY_EDGES[i - 1] if i > 0 else t.low
+    hi = TALLY_EDGES[i] if i < TALLY_EDGES.size else t.high
+    lo, hi = max(lo, t.low), min(hi, t.high)
+    if lo > 0:
+        value = lo * (hi / lo) ** frac
+    else:
+        value = lo + (hi - lo) * frac
+    return float(np.clip(value, t.low, t.high))
+
+
+def summarize(t, bins=BINS, seed=None):
+    """Percentiles, mean and a ``bins``-bar histogram of a ``Tally``."""
+    if not t.n:
+        raise ValueError("no realizations to summarize")
+    summary = {name: percentile(t, q) for name, q in PERCENTILES.items()}
+    summary["Mean"] = t.total / t.n
+    # Display bars split each tally bin by overlap: interpolate the cumulative
+    # count at the bar edges (one point per distinct bin edge inside low..high)
+    bounds = np.clip(np.concatenate([[t.low], TALLY_EDGES, [t.high]]), t.low, t.high)
+    cumulative = np.concatenate([[0], np.cumsum(t.counts)])
+    last = np.concatenate([np.diff(bounds) > 0, [True]])
+    edges = np.linspace(t.low, t.high, bins + 1)
+    at_edges = np.round(np.interp(edges[1:], bounds[last], cumulative[last]))
+    counts = np.diff(np.concatenate([[0], at_edges])).astype(np.int64)
+    return MonteCarloResult(t.n, summary, counts, edges, seed)
+
+
+def histogram_frame(result):
+    return pd.DataFrame({
+        "EUR Low": result.edges[:-1],
+        "EUR High": result.edges[1:],
+        "Count": result.counts,
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo EUR for a modified-hyperbolic decline.")
+    help_range = "LOW HIGH: P90/P10 of a lognormal ({}), or one value to fix it"
+    parser.add_argument("--qi", nargs="+", type=float, required=True, help=help_range.format("volume/day"))
+    parser.add_argument("--di", nargs="+", type=float, required=True, help=help_range.format("nominal per month"))
+    parser.add_argument("--b", nargs="+", type=float, required=True, help="LOW HIGH of a uniform, or one value")
+    parser.add_argument("--dmin", nargs="+", type=float, default=[0.06],
+                        help="terminal decline as effective annual fraction: LOW HIGH uniform, or one value")
+    parser.add_argument("--n", type=int, default=1000000, help="realizations")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--months", type=int, default=MONTHS)
+    parser.add_argument("--q-limit", type=float, default=0.0, help="economic limit rate, volume/day")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", help="CSV file for the EUR histogram")
+    args = parser.parse_args(argv)
+
+    def dist(values, kind):
+        return ("fixed", values[0]) if len(values) == 1 else (kind, values[0], values[1])
+
+    dmin = [float(decline.nominal_from_effective(v)) for v in args.dmin]
+    spec = {
+        "qi": dist(args.qi, "lognormal"),
+        "di": dist(args.di, "lognormal"),
+        "b": dist(args.b, "uniform"),
+        "dmin": dist(dmin, "uniform"),
+    }
+    result = simulate(spec, args.n, args.seed, months=args.months, q_limit=args.q_limit,
+                      processes=args.workers)
+    for name, value in result.summary.items():
+        print(f"EUR {name}: {value:,.0f}")
+    print(f"{args.n} realizations, seed {args.seed}")
+    if args.out:
+        histogram_frame(result).to_csv(args.out, index=False)
+
+
+if __name__ == "__main__":
+    main()
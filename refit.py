@@ -0,0 +1,228 @@
+"""
+Incremental refits for a portfolio whose production keeps growing.
+
+    python refit.py WELL_DIR OUT_DIR [--format parquet] [--workers 8]
+
+OUT_DIR is a batch.py output directory, and its ``fits-NNNNN.csv`` parts
+are the fit cache: every row holds a well's fit, a content hash of the
+history and fit settings it was fit to, and a stamp of the fit settings
+plus the size and mtime of the CSV it came from. Each run skips wells whose
+stamp is unchanged, re-reads and hashes the rest, and refits only those
+whose hash changed, warm-started from the previous parameters. Changing the
+phase or fit settings changes every stamp and hash, so all wells are refit.
+
+Only the parts holding changed wells are rewritten: their fits and their
+``forecast-NNNNN.<fmt>`` forecasts are replaced (just the fits when a file
+was touched but its history is the same), wells new to WELL_DIR go to
+new parts, and wells no longer in WELL_DIR are dropped. Forecasts of just
+the refit wells also go to ``OUT_DIR/changes-<time>.<fmt>``, so downstream
+jobs can pick up the delta. A nightly run costs in proportion to the wells
+that received new months rather than to the portfolio. Running it on an
+empty OUT_DIR fits everything, like batch.py.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import batch
+import fitting
+import loader
+
+CacheEntry = namedtuple("CacheEntry", "digest stamp fit error last")
+
+
+def _text(value):
+    return None if pd.isna(value) else str(value)
+
+
+class FitCache:
+    """Fits by API, kept in the fits parts of a batch.py output directory."""
+
+    def __init__(self, out_dir):
+        self.checkpoint = batch.Checkpoint(out_dir)
+        self.checkpoint.remove_orphans()
+        self.entries = {}
+        self.chunks = {}
+        self.dirty = set()   # chunks whose fits and forecasts are rewritten
+        self.stale = set()   # chunks whose fits part alone is rewritten
+        for chunk in sorted(self.checkpoint.chunks):
+            path = self.checkpoint.part(chunk, "fits", "csv")
+            df = pd.read_csv(path, dtype={"API": str, "LastMonth": str, "Hash": str, "Stamp": str, "Error": str})
+            df = df.reindex(columns=["API", *fitting.FitResult._fields, "LastMonth", "Hash", "Stamp", "Error"])
+            fits = fitting.fits_from_frame(df)
+            rows = zip(df["API"], df["Hash"], df["Stamp"], df["Error"], df["LastMonth"], fits)
+            for api, digest, stamp, error, last, fit in rows:
+                self.entries[api] = CacheEntry(_text(digest), _text(stamp), fit, _text(error) or "", _text(last) or "")
+                self.chunks[api] = chunk
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, api):
+        return self.entries.get(api)
+
+    def put(self, api, digest, stamp, fit, error="", last=""):
+        """
+        Store a well's fit. Its part is rewritten only when something changed:
+        a new digest or fit rewrites the forecasts too, a new stamp, error or
+        last month just the fits.
+        """
+        old = self.entries.get(api)
+        self.entries[api] = CacheEntry(digest, stamp, fit, error, last)
+        chunk = self.chunks.get(api)
+        if old is None or chunk is None:
+            return
+        if old.digest != digest or not np.array_equal(old.fit, fit, equal_nan=True):
+            self.dirty.add(chunk)
+        elif (old.stamp, old.error, old.last) != (stamp, error, last):
+            self.stale.add(chunk)
+
+    def retain(self, apis):
+        """Drop wells not in ``apis``; returns how many were dropped."""
+        gone = set(self.entries) - set(apis)
+        for api in gone:
+            del self.entries[api]
+            chunk = self.chunks.pop(api, None)
+            if chunk is not None:
+                self.dirty.add(chunk)
+        return len(gone)
+
+    def _forecast_format(self, chunk, fmt):
+        # Rewrite a part in the format it was first written in
+        for existing in ("csv", "parquet"):
+            if os.path.exists(self.checkpoint.part(chunk, "forecast", existing)):
+                return existing
+        return fmt
+
+    def _write(self, chunk, apis, fmt, months, forecasts=True):
+        entries = [self.entries[api] for api in apis]
+        fits = [e.fit for e in entries]
+        if forecasts:
+            batch.write_frame(
+                batch.forecast_frame(apis, fits, months),
+                self.checkpoint.part(chunk, "forecast", self._forecast_format(chunk, fmt)),
+                self._forecast_format(chunk, fmt),
+            )
+        batch.write_frame(
+            batch.fits_frame(
+                apis, fits,
+                LastMonth=[e.last for e in entries],
+                Hash=[e.digest for e in entries],
+                Stamp=[e.stamp for e in entries],
+                Error=[e.error for e in entries],
+            ),
+            self.checkpoint.part(chunk, "fits", "csv"),
+            "csv",
+        )
+
+    def save(self, fmt="csv", months=600, chunk_size=1000):
+        """
+        Rewrite the parts holding changed wells and add new wells as new
+        parts; returns the number of parts written.
+        """
+        members = {}
+        for api, chunk in self.chunks.items():
+            members.setdefault(chunk, []).append(api)
+        for chunk in sorted(self.dirty | self.stale):
+            self._write(chunk, sorted(members.get(chunk, [])), fmt, months, forecasts=chunk in self.dirty)
+        written = len(self.dirty | self.stale)
+        self.dirty.clear()
+        self.stale.clear()
+
+        new = sorted(api for api in self.entries if api not in self.chunks)
+        for start in range(0, len(new), chunk_size):
+            chunk = self.checkpoint.next_chunk()
+            apis = new[start:start + chunk_size]
+            self._write(chunk, apis, fmt, months)
+            self.checkpoint.record(chunk)
+            self.chunks.update((api, chunk) for api in apis)
+            written += 1
+        return written
+
+
+def run(well_dir, out_dir, fmt="csv", phase="Oil", months=600, workers=None, chunksize=64,
+        chunk_size=1000, **fit_kwargs):
+    """Refit the changed wells of ``well_dir`` against the batch output in ``out_dir``."""
+    os.makedirs(out_dir, exist_ok=True)
+    cache = FitCache(out_dir)
+    wells = batch.list_wells(well_dir)
+    settings = batch.settings_key(phase, **fit_kwargs)
+
+    jobs = []
+    stamps = {}
+    for api, source in wells:
+        previous = cache.get(api)
+        stamp = batch.source_stamp(well_dir, source, settings)
+        if previous is not None and stamp is not None and previous.stamp == stamp:
+            continue
+        stamps[api] = stamp
+        known = (previous.digest, previous.fit) if previous is not None else (None, fitting.FAILED)
+        jobs.append((api, well_dir, source, phase, known, fit_kwargs))
+
+    if workers == 1 or len(jobs) < 2 * chunksize:
+        results = [batch.fit_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            results = list(pool.map(batch.fit_job, jobs, chunksize=chunksize))
+
+    apis, fits = [], []
+    for api, digest, fit, last, error in results:
+        if error:
+            print(f"{api}: {error}", file=sys.stderr)
+        if fit is None:
+            # Same history under a new stamp: keep the fit, record the stamp
+            entry = cache.get(api)
+            cache.put(api, digest, stamps[api], entry.fit, entry.error, last)
+            continue
+        cache.put(api, digest, stamps[api], fit, error, last)
+        apis.append(api)
+        fits.append(fit)
+    dropped = cache.retain(api for api, _ in wells)
+
+    if apis:
+        path = os.path.join(out_dir, time.strftime(f"changes-%Y%m%d-%H%M%S.{fmt}"))
+        batch.write_frame(batch.forecast_frame(apis, fits, months), path, fmt)
+    parts = cache.save(fmt, months, chunk_size)
+    print(
+        f"{len(wells)} wells: {len(wells) - len(jobs)} untouched, {len(jobs) - len(apis)} unchanged, "
+        f"{len(apis)} refit, {dropped} dropped; {parts} parts rewritten",
+        file=sys.stderr,
+    )
+    return apis
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refit only the wells whose production changed.")
+    parser.add_argument("well_dir", help="directory of <API>.csv production files, or a columnar store")
+    parser.add_argument("out_dir", help="output directory of a batch.py run (created if missing)")
+    parser.add_argument("--format", choices=("csv", "parquet"), default="csv")
+    parser.add_argument("--phase", choices=loader.PHASES, default="Oil")
+    parser.add_argument("--months", type=int, default=600, help="forecast length in months")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="wells per new output part")
+    parser.add_argument("--b-min", type=float, default=fitting.B_BOUNDS[0])
+    parser.add_argument("--b-max", type=float, default=fitting.B_BOUNDS[1])
+    parser.add_argument("--no-peak-align", action="store_true", help="fit from first production instead of peak month")
+    args = parser.parse_args(argv)
+
+    run(
+        args.well_dir,
+        args.out_dir,
+        fmt=args.format,
+        phase=args.phase,
+        months=args.months,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        b_bounds=(args.b_min, args.b_max),
+        align_peak=not args.no_peak_align,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Well metadata registry.
+
+A CSV of API, Well Name, Operator and Basin (plus an optional Phases column
+listing which streams to plot, space separated) is loaded once into sorted
+arrays. ``search`` answers dropdown queries with API and name prefix matches
+first, then substring matches on any field, and stops as soon as it has
+``limit`` results, so lookups stay fast for tens of thousands of wells.
+"""
+import functools
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+import loader
+
+COLUMNS = ("API", "Well Name", "Operator", "Basin")
+LIMIT = 50
+
+WellInfo = namedtuple("WellInfo", "api name operator basin phases")
+WellInfo.__doc__ = """\
+Metadata for one well; ``phases`` are the streams to plot (all of
+loader.PHASES unless the registry lists them)."""
+
+
+def _prefix_index(keys):
+    order = np.argsort(keys, kind="stable")
+    return keys[order], order
+
+
+def _prefix_range(keys, query):
+    lo = np.searchsorted(keys, query, side="left")
+    hi = np.searchsorted(keys, query + "\U0010ffff", side="left")
+    return lo, hi
+
+
+class WellRegistry:
+    """In-memory index of well metadata, sorted by API."""
+
+    def __init__(self, frame):
+        frame = frame.fillna("").astype(str).sort_values("API").drop_duplicates("API")
+        self.apis = frame["API"].to_numpy()
+        self.names = frame["Well Name"].to_numpy()
+        self.operators = frame["Operator"].to_numpy()
+        self.basins = frame["Basin"].to_numpy()
+        phases = frame["Phases"] if "Phases" in frame.columns else pd.Series("", index=frame.index)
+        self.phases = [tuple(p.split()) or loader.PHASES for p in phases]
+
+        lower = np.char.lower
+        self._api_keys, self._api_rows = _prefix_index(lower(self.apis.astype(str)))
+        self._name_keys, self._name_rows = _prefix_index(lower(self.names.astype(str)))
+        # One lowercase line per well; substring search runs str.find over it
+        lines = [" | ".join(fields).lower() for fields in zip(self.apis, self.names, self.operators, self.basins)]
+        self._text = "\n".join(lines)
+        self._starts = np.cumsum([0] + [len(line) + 1 for line in lines[:-1]])
+
+    @classmethod
+    def from_csv(cls, path):
+        frame = pd.read_csv(path, dtype=str)
+        missing = [c for c in COLUMNS if c not in frame.columns]
+        if missing:
+            raise ValueError(f"{path} is missing columns: {', '.join(missing)}")
+        return cls(frame)
+
+    def __len__(self):
+        return len(self.apis)
+
+    def __iter__(self):
+        return iter(str(api) for api in self.apis)
+
+    def __contains__(self, api):
+        return self._position(api) is not None
+
+    def _position(self, api):
+        i = int(np.searchsorted(self.apis, api))
+        if i < len(self.apis) and self.apis[i] == api:
+            return i
+        return None
+
+    def _info(self, i):
+        return WellInfo(str(self.apis[i]), str(self.names[i]), str(self.operators[i]), str(self.basins[i]), self.phases[i])
+
+    def get(self, api):
+        """WellInfo for ``api``, or None."""
+        i = self._position(api)
+        return None if i is None else self._info(i)
+
+    def search(self, query, limit=LIMIT):
+        """
+        Up to ``limit`` WellInfo matching ``query``: API and name prefix
+        matches first (each in sorted order), then substring matches on
+        any field. Case-insensitive.
+        """
+        query = query.strip().lower()
+        if not query:
+            return [self._info(i) for i in range(min(limit, len(self)))]
+        rows = []
+        seen = set()
+
+        def add(i):
+            if i not in seen:
+                seen.add(i)
+                rows.append(i)
+            return len(rows) >= limit
+
+        for keys, order in ((self._api_keys, self._api_rows), (self._name_keys, self._name_rows)):
+            lo, hi = _prefix_range(keys, query)
+            for i in order[lo:min(hi, lo + limit)]:
+                if add(int(i)):
+                    return [self._info(i) for i in rows]
+
+        pos = self._text.find(query)
+        while pos != -1:
+            row = int(np.searchsorted(self._starts, pos, side="right")) - 1
+            if add(row):
+                break
+            if row + 1 >= len(self._starts):
+                break
+            pos = self._text.find(query, int(self._starts[row + 1]))
+        return [self._info(i) for i in rows]
+
+    def option(self, api):
+        """Dropdown option for ``api``, searchable in the browser by every field."""
+        info = self.get(api)
+        if info is None:
+            return {"label": api, "value": api}
+        return {
+            "label": f"{info.name} ({info.api})",
+            "value": api,
+            "search": " ".join((info.api, info.name, info.operator, info.basin)),
+        }
+
+    def options(self, query, selected=(), limit=LIMIT):
+        """Dropdown options for a search, always including the ``selected`` APIs."""
+        options = [self.option(api) for api in selected if api]
+        chosen = {o["value"] for o in options}
+        options += [self.option(info.api) for info in self.search(query, limit) if info.api not in chosen]
+        return options
+
+
+@functools.lru_cache(maxsize=None)
+def load_registry(path):
+    """Shared ``WellRegistry`` for a metadata CSV, loaded once per process."""
+    return WellRegistry.from_csv(path)
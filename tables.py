@@ -0,0 +1,136 @@
+"""
+Server-side storage for the production table.
+
+Each browser session gets its own table, kept here instead of in the
+DataTable, so the client only ever holds the page it is looking at and
+edits send just the rows that changed. Sessions are evicted least recently
+used first. Tables live in this process; run gunicorn with one worker (the
+Procfile default) or sticky sessions.
+"""
+import io
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+COLUMNS = ("Month", "Oil", "Water", "Gas")
+MAX_SESSIONS = 256
+
+
+def empty_table():
+    return pd.DataFrame({c: pd.Series(dtype=float) for c in COLUMNS})
+
+
+def coerce(df):
+    """Table columns in order, as floats; unparseable cells become NaN."""
+    df = df.reindex(columns=list(COLUMNS))
+    return df.apply(pd.to_numeric, errors="coerce").astype(float).reset_index(drop=True)
+
+
+def parse_paste(text):
+    """
+    Rows pasted from a spreadsheet or CSV.
+
+    Tabs, commas or semicolons separate columns. A header row naming the
+    columns is optional; without one the columns are taken as Month, Oil,
+    Water, Gas in that order.
+    """
+    text = text.strip()
+    if not text:
+        return empty_table()
+    df = pd.read_csv(io.StringIO(text), sep=None, engine="python", header=None, dtype=str)
+    first = [str(v).strip().title() for v in df.iloc[0]]
+    if set(first) & set(COLUMNS):
+        df = df.iloc[1:]
+        df.columns = first
+    else:
+        df = df.iloc[:, :len(COLUMNS)]
+        df.columns = list(COLUMNS)[:df.shape[1]]
+    for column in df.columns:
+        df[column] = df[column].str.replace(",", "", regex=False).str.strip()
+    return coerce(df)
+
+
+class TableStore:
+    """Per-session production tables, keyed by session id."""
+
+    def __init__(self, max_sessions=MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self._tables = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, session):
+        with self._lock:
+            df = self._tables.get(session)
+            if df is None:
+                return empty_table()
+            self._tables.move_to_end(session)
+            return df
+
+    def version(self, session):
+        """Counter bumped on every change, for keying caches of derived data."""
+        return self._versions.get(session, 0)
+
+    def _put(self, session, df):
+        with self._lock:
+            self._tables[session] = df
+            self._tables.move_to_end(session)
+            self._versions[session] = self._versions.get(session, 0) + 1
+            while len(self._tables) > self.max_sessions:
+                evicted, _ = self._tables.popitem(last=False)
+                self._versions.pop(evicted, None)
+
+    def __len__(self):
+        return len(self._tables)
+
+    def n_rows(self, session):
+        return len(self.get(session))
+
+    def page(self, session, page, size):
+        """Rows on ``page`` as DataTable records."""
+        df = self.get(session).iloc[page * size:(page + 1) * size]
+        return df.astype(object).where(df.notna(), None).to_dict("records")
+
+    def replace(self, session, df):
+        self._put(session, coerce(df))
+
+    def append_row(self, session):
+        df = self.get(session)
+        row = pd.DataFrame([{c: 0.0 for c in COLUMNS}])
+        self._put(session, pd.concat([df, row], ignore_index=True))
+
+    def set_rows(self, session, changes):
+        """Apply ``[(index, row), ...]``; indices past the end append rows."""
+        df = self.get(session).copy()
+        for index, row in changes:
+            values = coerce(pd.DataFrame([row])).iloc[0]
+            df.loc[index] = values
+        self._put(session, df.sort_index().reset_index(drop=True))
+
+    def delete_row(self, session, index):
+        df = self.get(session)
+        self._put(session, df.drop(index=index).reset_index(drop=True))
+
+
+def diff_rows(rows, previous):
+    """
+    Changes between two versions of a DataTable page.
+
+    Returns ``("delete", i)`` when one row was removed, ``("update", [(i, row),
+    ...])`` for edited or pasted rows, or ``None`` when nothing changed.
+    """
+    previous = previous or []
+    if len(rows) == len(previous) - 1:
+        for i, (new, old) in enumerate(zip(rows, previous)):
+            if new != old:
+                return "delete", i
+        return "delete", len(rows)
+    changed = [
+        (i, row) for i, row in enumerate(rows)
+        if i >= len(previous) or row != previous[i]
+    ]
+    return ("update", changed) if changed else None
+
+
+store = TableStore()
@@ -0,0 +1,89 @@
+import json
+import sys
+
+import flask
+import numpy as np
+import pytest
+
+import api
+import decline
+
+
+@pytest.fixture(scope="module")
+def client():
+    app = flask.Flask(__name__)
+    api.register(app)
+    return app.test_client()
+
+
+def post(client, path, body):
+    data = body if isinstance(body, str) else json.dumps(body)
+    return client.post(path, data=data, content_type="application/json")
+
+
+def test_forecast_matches_engine(client):
+    r = post(client, "/api/forecast", {"months": 24, "wells": [{"id": "A", "qi": 350, "di": 0.05, "b": 0.9, "dmin": 0.005}]})
+    assert r.status_code == 200
+    well = r.get_json()["wells"][0]
+    t = np.arange(24.0)
+    np.testing.assert_allclose(well["rate"], decline.modified_rate(350, 0.05, 0.9, 0.005, t)[0])
+    np.testing.assert_allclose(well["cum"], decline.modified_cum(350, 0.05, 0.9, 0.005, t)[0] * decline.DAYS_PER_MONTH)
+
+
+def test_eur_of_a_history(client):
+    history = (200 * np.exp(-0.04 * np.arange(36))).tolist()
+    history[10] = None
+    r = post(client, "/api/eur", {"q_limit": 5, "wells": [{"id": "H", "history": history}]})
+    assert r.status_code == 200
+    well = r.get_json()["wells"][0]
+    assert well["qi"] == pytest.approx(200, rel=0.01)
+    assert well["eur"] > 0
+
+
+@pytest.mark.parametrize("path, body", [
+    ("/api/forecast", '{"months": 12, "wells": [{"qi": NaN, "di": 0.1}]}'),
+    ("/api/forecast", '{"months": 12, "wells": [{"qi": 100, "di": Infinity}]}'),
+    ("/api/forecast", '{"months": NaN, "wells": [{"qi": 100, "di": 0.1}]}'),
+    ("/api/forecast", {"months": 0, "wells": [{"qi": 100, "di": 0.1}]}),
+    ("/api/forecast", {"months": api.MAX_MONTHS + 1, "wells": [{"qi": 100, "di": 0.1}]}),
+    ("/api/forecast", {"months": "x", "wells": [{"qi": 100, "di": 0.1}]}),
+    ("/api/forecast", {"months": 12, "wells": []}),
+    ("/api/forecast", {"months": 12, "wells": [5]}),
+    ("/api/forecast", {"months": 12, "wells": [{"di": 0.1}]}),
+    ("/api/forecast", {"months": 12, "wells": [{"qi": True, "di": 0.1}]}),
+    ("/api/forecast", {"months": 12, "wells": [{"qi": -100, "di": 0.1}]}),
+    ("/api/forecast", {"months": 12, "wells": [{"qi": 0, "di": 0.1}]}),
+    ("/api/forecast", {"months": 12, "wells": [{"qi": 100, "di": -0.1}]}),
+    ("/api/forecast", {"months": 12, "wells": [{"qi": 100, "di": 0.1, "b": -0.5}]}),
+    ("/api/forecast", {"months": 12, "wells": [{"qi": 100, "di": 0.1, "dmin": -0.01}]}),
+    ("/api/forecast", {"months": 12, "wells": [{"history": [[1, 2], [3, 4]]}]}),
+    ("/api/forecast", {"months": 12, "wells": [{"history": [1, "a"]}]}),
+    ("/api/forecast", {"months": 12, "wells": [{"history": []}]}),
+    ("/api/forecast", {"months": 12, "wells": [{"history": [0, 0, 0]}]}),
+    ("/api/forecast", "[1, 2]"),
+    ("/api/eur", '{"t_max": Infinity, "wells": [{"qi": 100, "di": 0.1}]}'),
+    ("/api/eur", {"t_max": -5, "wells": [{"qi": 100, "di": 0.1}]}),
+    ("/api/eur", {"t_max": 0, "wells": [{"qi": 100, "di": 0.1}]}),
+    ("/api/eur", {"q_limit": -5, "wells": [{"qi": 100, "di": 0.1}]}),
+])
+def test_bad_requests_are_400(client, path, body):
+    r = post(client, path, body)
+    assert r.status_code == 400
+    assert "error" in r.get_json()
+
+
+def test_responses_are_strict_json(client):
+    r = post(client, "/api/eur", {"wells": [{"qi": 100, "di": 0.1, "b": 1.0}], "q_limit": 0})
+    assert r.status_code == 200
+    json.loads(r.data, parse_constant=lambda c: pytest.fail(f"non-JSON constant {c}"))
+
+
+def test_result_cache_keeps_to_its_byte_ceiling():
+    fragment = "x" * 1000
+    cache = api.ResultCache(max_entries=100, max_bytes=10 * sys.getsizeof(fragment))
+    for i in range(50):
+        cache.put(i, fragment)
+    assert len(cache._entries) == 10 and cache.nbytes <= cache.max_bytes
+    assert cache.get(0) is None and cache.get(49) == fragment
+    cache.put(49, "y")
+    assert cache.nbytes == 9 * sys.getsizeof(fragment) + sys.getsizeof("y")
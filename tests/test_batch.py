@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import batch
+import decline
+
+
+def write_wells(directory, n, months=48, seed=0):
+    rng = np.random.default_rng(seed)
+    apis = []
+    for i in range(n):
+        q = decline.arps_rate(300.0, 0.08, 0.8, np.arange(months))[0] * decline.DAYS_PER_MONTH
+        df = pd.DataFrame({"Month": np.arange(months), "Oil": (q * rng.lognormal(0, 0.05, months)).round(1)})
+        api = f"99-000-{i:05d}-0000"
+        df.to_csv(os.path.join(directory, f"{api}.csv"), index=False)
+        apis.append(api)
+    return apis
+
+
+def read_fits(out_dir):
+    parts = sorted(n for n in os.listdir(out_dir) if n.startswith("fits-"))
+    return pd.concat([pd.read_csv(os.path.join(out_dir, p), dtype={"API": str}) for p in parts])
+
+
+@pytest.fixture
+def wells(tmp_path):
+    well_dir = tmp_path / "wells"
+    well_dir.mkdir()
+    apis = write_wells(well_dir, 5)
+    # One unreadable file must not stop the run
+    (well_dir / "99-000-99999-0000.csv").write_text("")
+    return str(well_dir), apis + ["99-000-99999-0000"]
+
+
+def test_run_fits_every_well_and_records_failures(wells, tmp_path):
+    well_dir, apis = wells
+    out = str(tmp_path / "out")
+    batch.run(well_dir, out, months=24, workers=1, chunk_size=2)
+
+    fits = read_fits(out)
+    assert sorted(fits["API"]) == sorted(apis)
+    bad = fits.set_index("API").loc["99-000-99999-0000"]
+    assert not bad["success"] and "EmptyDataError" in bad["Error"]
+    forecast = pd.concat(pd.read_csv(os.path.join(out, n), dtype={"API": str})
+                         for n in os.listdir(out) if n.startswith("forecast-"))
+    assert forecast.groupby("API").size().eq(24).all()
+    assert len(forecast["API"].unique()) == 5
+
+
+def test_resume_redoes_only_the_unrecorded_chunk(wells, tmp_path):
+    well_dir, apis = wells
+    out = str(tmp_path / "out")
+    batch.run(well_dir, out, months=12, workers=1, chunk_size=2)
+
+    # Simulate a crash after the last chunk's parts were written but before
+    # it was recorded in the checkpoint
+    checkpoint = os.path.join(out, batch.CHECKPOINT)
+    with open(checkpoint) as f:
+        chunks = f.read().split()
+    with open(checkpoint, "w") as f:
+        f.write("\n".join(chunks[:-1]) + "\n")
+    recorded = {n: os.path.getmtime(os.path.join(out, n)) for n in os.listdir(out) if n.endswith("00000.csv")}
+
+    batch.run(well_dir, out, months=12, workers=1, chunk_size=2)
+
+    fits = read_fits(out)
+    assert sorted(fits["API"]) == sorted(apis)
+    assert not fits["API"].duplicated().any()
+    for name, mtime in recorded.items():
+        assert os.path.getmtime(os.path.join(out, name)) == mtime
+
+    # A finished run has nothing left to do
+    batch.run(well_dir, out, months=12, workers=1, chunk_size=2)
+    assert len(read_fits(out)) == len(apis)
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+import cleaning
+import fitting
+import typecurve
+
+
+def history(months=48):
+    return 300 * np.exp(-0.05 * np.arange(months))
+
+
+def test_flags_and_blanks_bad_months():
+    rates = np.concatenate([[40.0], history()])
+    rates[10] = np.nan
+    rates[20] = 0.0
+    rates[30] *= 20
+    result = cleaning.clean(rates)
+    assert result.peak == 1
+    assert result.flags[0] & cleaning.PRE_PEAK
+    assert result.flags[10] & cleaning.MISSING
+    assert result.flags[20] & cleaning.SHUT_IN
+    assert result.flags[30] & cleaning.OUTLIER
+    assert np.isnan(result.rates[[10, 20, 30]]).all()
+    good = np.ones(rates.size, bool)
+    good[[0, 10, 20, 30]] = False
+    np.testing.assert_array_equal(result.rates[good], rates[good])
+
+
+def test_smooth_noise_is_not_an_outlier():
+    rng = np.random.default_rng(0)
+    rates = history() * rng.lognormal(0, 0.05, 48)
+    assert not (cleaning.clean(rates).flags & cleaning.OUTLIER).any()
+
+
+def test_fills():
+    rates = history(10)
+    rates[4] = np.nan
+    interpolated = cleaning.clean(rates, fill="interpolate").rates
+    assert interpolated[4] == pytest.approx(np.sqrt(rates[3] * rates[5]))
+    dropped = cleaning.clean(rates, fill="drop").rates
+    np.testing.assert_array_equal(dropped[:9], np.delete(rates, 4))
+    assert np.isnan(dropped[9])
+
+
+def test_matrix_rows_match_single_histories():
+    rng = np.random.default_rng(1)
+    rows = [history(n) * rng.lognormal(0, 0.3, n) for n in (12, 30, 48)]
+    matrix = cleaning.clean(cleaning.pad(rows))
+    for i, row in enumerate(rows):
+        single = cleaning.clean(row)
+        np.testing.assert_array_equal(matrix.flags[i, :row.size], single.flags)
+        assert matrix.peak[i] == single.peak
+
+
+def test_empty_histories_have_no_peak():
+    single = cleaning.clean(np.empty(0))
+    assert single.peak == -1 and single.rates.size == 0 and single.flags.size == 0
+    matrix = cleaning.clean(cleaning.pad([[], []]))
+    assert matrix.rates.shape == (2, 0)
+    np.testing.assert_array_equal(matrix.peak, [-1, -1])
+    assert cleaning.clean(cleaning.pad([])).rates.shape == (0, 0)
+
+
+def test_empty_history_fails_to_fit_instead_of_raising():
+    assert not fitting.fit_arps(cleaning.clean(np.empty(0)).rates).success
+    assert not typecurve.build([]).fit.success
@@ -0,0 +1,50 @@
+import os
+
+import numpy as np
+import pytest
+
+import columnar
+import loader
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATED = "42-135-41592-0000"
+UNDATED = "42-383-37763-0000"
+
+
+@pytest.fixture
+def store(tmp_path):
+    paths = [os.path.join(ROOT, f"{api}.csv") for api in (DATED, UNDATED)]
+    gap = tmp_path / "99-000-00001-0000-LONG-IDENTIFIER-PAST-32-CHARS.csv"
+    gap.write_text("Month,Oil\n11/2019,300\n12/2019,280\n03/2020,250\n")
+    columnar.build_store(paths + [str(gap)], str(tmp_path / "store"))
+    return columnar.ColumnarStore(str(tmp_path / "store"))
+
+
+def test_wells_match_the_csv_loader(store):
+    assert len(store) == 3
+    for api in (DATED, UNDATED):
+        expected = loader.parse_csv(os.path.join(ROOT, f"{api}.csv"))
+        well = store.well(api)
+        assert set(well.phases()) == set(expected.phases())
+        for phase, values in expected.phases().items():
+            np.testing.assert_allclose(well.phases()[phase], values, rtol=1e-6)
+
+
+def test_long_apis_are_not_truncated(store):
+    api = "99-000-00001-0000-LONG-IDENTIFIER-PAST-32-CHARS"
+    assert api in store and api in list(store)
+    assert store.well(api).oil.size == 3
+
+
+def test_months_keep_calendar_dates_and_gaps(store):
+    offsets, start = store.months(DATED)
+    assert start == 2012 * 12 + 4
+    np.testing.assert_array_equal(offsets[:3], [0, 1, 2])
+
+    offsets, start = store.months("99-000-00001-0000-LONG-IDENTIFIER-PAST-32-CHARS")
+    assert start == 2019 * 12 + 10
+    np.testing.assert_array_equal(offsets, [0, 1, 4])
+
+    offsets, start = store.months(UNDATED)
+    assert start == -1
+    np.testing.assert_array_equal(offsets, np.arange(len(store.well(UNDATED))))
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from scipy.integrate import quad
+
+import decline
+
+WELLS = [
+    # qi, di, b, dmin
+    (350.0, 0.05, 0.0, 0.0),
+    (350.0, 0.15, 0.5, 0.0),
+    (350.0, 0.15, 1.0, 0.0),
+    (350.0, 0.30, 1.4, 0.0),
+    (350.0, 0.30, 0.9, 0.006),
+    (350.0, 0.30, 1.4, 0.006),
+    (350.0, 0.004, 0.9, 0.006),  # starts below dmin, never switches
+]
+
+
+def integrate(qi, di, b, dmin, t_end):
+    rate = lambda t: decline.modified_rate(qi, di, b, dmin, t)[0, 0]
+    return quad(rate, 0, t_end, limit=500)[0]
+
+
+@pytest.mark.parametrize("qi, di, b, dmin", WELLS)
+def test_modified_cum_matches_integral(qi, di, b, dmin):
+    t = np.array([0.0, 1.0, 24.0, 120.0, 600.0])
+    cum = decline.modified_cum(qi, di, b, dmin, t)[0]
+    expected = [integrate(qi, di, b, dmin, x) for x in t]
+    np.testing.assert_allclose(cum, expected, rtol=1e-7, atol=1e-9)
+
+
+@pytest.mark.parametrize("qi, di, b, dmin", WELLS)
+def test_eur_matches_integral_to_limit(qi, di, b, dmin):
+    q_limit, t_max = 5.0, 600.0
+    t_end = min(decline.time_to_rate(qi, di, b, dmin, q_limit)[0], t_max)
+    eur = decline.eur(qi, di, b, dmin, q_limit, t_max)[0]
+    assert eur == pytest.approx(integrate(qi, di, b, dmin, t_end), rel=1e-7)
+
+
+@pytest.mark.parametrize("qi, di, b, dmin", WELLS)
+def test_time_to_rate_hits_the_limit(qi, di, b, dmin):
+    t = decline.time_to_rate(qi, di, b, dmin, 20.0)[0]
+    assert decline.modified_rate(qi, di, b, dmin, t)[0, 0] == pytest.approx(20.0, rel=1e-9)
+
+
+def test_arps_cum_matches_integral():
+    qi, di, b = np.array([100.0, 100.0, 100.0]), np.array([0.1, 0.1, 0.1]), np.array([0.0, 0.5, 1.0])
+    t = np.array([12.0, 60.0])
+    _, cum = decline.arps(qi, di, b, t)
+    for i in range(3):
+        for j, x in enumerate(t):
+            expected = quad(lambda s: decline.arps_rate(qi[i], di[i], b[i], s)[0, 0], 0, x)[0]
+            assert cum[i, j] == pytest.approx(expected, rel=1e-7)
+
+
+def test_eur_edge_cases():
+    # Already below the limit, and an unbounded harmonic with no limit
+    assert decline.eur(3.0, 0.1, 0.5, 0.0, q_limit=5.0)[0] == 0.0
+    assert np.isinf(decline.eur(100.0, 0.1, 1.0, 0.0, q_limit=0.0)[0])
+    with np.errstate(all="raise"):
+        decline.eur(np.full(100, 100.0), np.linspace(0.001, 0.5, 100), 0.9, 0.01, 1.0, 600.0)
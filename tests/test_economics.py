@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import economics
+
+
+def test_flat_well_npv_is_discounted_cash_flow():
+    volume = np.full((1, 24), 1000.0)
+    cf = economics.cash_flow(volume, 70, opex_fixed=5000, opex_var=4, nri=0.8, discount=0.1, capex=1e5)
+    monthly = 1000 * 70 * 0.8 - (5000 + 4 * 1000)
+    assert cf.life[0] == 24
+    np.testing.assert_allclose(cf.ncf, monthly)
+    expected = monthly * economics.discount_factors(24, 0.1).sum() - 1e5
+    assert cf.npv[0] == pytest.approx(expected)
+
+
+def test_economic_limit_cuts_off_later_months():
+    volume = np.array([[100.0, 80.0, 10.0, 50.0]])
+    cf = economics.cash_flow(volume, 10, opex_fixed=500, nri=1.0)
+    assert cf.life[0] == 2
+    np.testing.assert_array_equal(cf.ncf[0, 2:], 0)
+    np.testing.assert_array_equal(cf.revenue[0, 2:], 0)
+
+
+def test_per_well_and_per_month_inputs_are_told_apart():
+    # As many wells as months, so only the shape says which axis is meant
+    volume = np.ones((3, 3))
+    per_well = economics.cash_flow(volume, np.array([10.0, 20.0, 30.0]), nri=1.0)
+    np.testing.assert_allclose(per_well.revenue, [[10] * 3, [20] * 3, [30] * 3])
+    per_month = economics.cash_flow(volume, np.array([[10.0, 20.0, 30.0]]), nri=1.0)
+    np.testing.assert_allclose(per_month.revenue, [[10, 20, 30]] * 3)
+    opex = economics.cash_flow(volume, 100, nri=1.0, opex_fixed=np.array([[1.0, 2.0, 3.0]]))
+    np.testing.assert_allclose(opex.ncf, [[99, 98, 97]] * 3)
+
+
+def test_short_decks_are_held_flat():
+    cf = economics.cash_flow(np.ones((2, 5)), np.array([[50.0, 60.0]]), nri=1.0)
+    np.testing.assert_allclose(cf.revenue[0], [50, 60, 60, 60, 60])
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"price": np.arange(5.0)},
+    {"price": 70, "opex_fixed": np.arange(5.0)},
+    {"price": 70, "nri": np.ones((2, 5))},
+    {"price": 70, "wi": np.ones((1, 5))},
+])
+def test_ambiguous_or_mismatched_shapes_raise(kwargs):
+    with pytest.raises(ValueError):
+        economics.cash_flow(np.ones((3, 5)), **kwargs)
+
+
+def test_npv_sensitivity_takes_scalar_and_monthly_decks():
+    volume = np.full((3, 3), 10.0)
+    npv = economics.npv_sensitivity(volume, [50, [40, 50, 60]], nri=1.0)
+    assert npv.shape == (2, 3)
+    expected = economics.cash_flow(volume, np.array([[40.0, 50.0, 60.0]]), nri=1.0).npv
+    np.testing.assert_allclose(npv[1], expected)
+
+
+def test_forecast_matrix_keeps_future_volumes():
+    df = pd.DataFrame({
+        "API": ["A"] * 4 + ["B"] * 3,
+        "Month": [2, 3, 4, 5, 0, 1, 2],
+        "Cum": [0, 100, 190, 270, 0, 50, 90],
+    })
+    apis, volume = economics.forecast_matrix(df, {"A": 3, "B": -1})
+    assert list(apis) == ["A", "B"]
+    # A's future months are 4 and 5; month 5 has no next Cum, and the
+    # shorter row is padded with zero volume
+    np.testing.assert_allclose(volume, [[80, 0], [50, 40]])
@@ -0,0 +1,91 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import batch
+import decline
+import export
+
+
+def write_dated(directory, api, first, months=36):
+    """A dated well CSV whose MM/YYYY months start at ``first`` (YYYY-MM)."""
+    dates = pd.period_range(first, periods=months, freq="M").strftime("%m/%Y")
+    q = decline.arps_rate(300.0, 0.08, 0.8, np.arange(months))[0] * decline.DAYS_PER_MONTH
+    pd.DataFrame({"Month": dates, "Oil": q.round(1)}).to_csv(os.path.join(directory, f"{api}.csv"), index=False)
+
+
+@pytest.fixture
+def out_dir(tmp_path):
+    wells = tmp_path / "wells"
+    wells.mkdir()
+    write_dated(wells, "99-000-00001-0000", "2019-01", months=36)  # last month 2021-12
+    write_dated(wells, "99-000-00002-0000", "2020-06", months=20)  # last month 2022-01
+    out = str(tmp_path / "out")
+    batch.run(str(wells), out, months=48, workers=1, chunk_size=1)
+    return out
+
+
+def test_read_fits_yields_each_well_once(out_dir):
+    chunks = list(export.read_fits(out_dir))
+    apis = [api for chunk_apis, _, _ in chunks for api in chunk_apis]
+    assert apis == ["99-000-00001-0000", "99-000-00002-0000"]
+    assert [last for _, _, lasts in chunks for last in lasts] == ["2021-12", "2022-01"]
+
+
+def test_csv_and_parquet_exports_match(out_dir):
+    frames = list(export.forecast_chunks(export.read_fits(out_dir, chunk_wells=1), months=48))
+    text = io.StringIO()
+    export.write(iter(frames), text, "csv")
+    binary = io.BytesIO()
+    export.write(iter(frames), binary, "parquet")
+
+    from_csv = pd.read_csv(io.StringIO(text.getvalue()), dtype={"API": str})
+    from_parquet = pd.read_parquet(io.BytesIO(binary.getvalue()))
+    assert len(from_csv) == 2 * 48
+    pd.testing.assert_frame_equal(from_csv, from_parquet, check_dtype=False)
+
+
+def test_aries_dates_each_well_from_its_own_last_month(out_dir):
+    frames = export.forecast_chunks(export.read_fits(out_dir), months=48)
+    text = io.StringIO()
+    export.write(frames, text, "aries")
+    aries = pd.read_csv(io.StringIO(text.getvalue()), dtype={"PROPNUM": str}, parse_dates=["P_DATE"])
+
+    first = aries.groupby("PROPNUM")["P_DATE"].min()
+    assert first["99-000-00001-0000"] == pd.Timestamp("2022-01-01")
+    assert first["99-000-00002-0000"] == pd.Timestamp("2022-02-01")
+    assert aries.groupby("PROPNUM")["P_DATE"].apply(lambda d: d.diff().dropna().dt.days.between(28, 31).all()).all()
+    assert (aries["OIL"] > 0).all() and aries["GAS"].isna().all()
+
+
+def test_aries_refuses_undated_wells(out_dir, tmp_path):
+    fits = pd.read_csv(os.path.join(out_dir, "fits-00000.csv"), dtype=str)
+    fits["LastMonth"] = np.nan
+    path = str(tmp_path / "undated.csv")
+    fits.to_csv(path, index=False)
+    with pytest.raises(ValueError, match="99-000-00001-0000"):
+        export.write(export.forecast_chunks(export.read_fits(path), months=48), io.StringIO(), "aries")
+
+
+@pytest.fixture(scope="module")
+def dashboard_client():
+    dashboard = pytest.importorskip("dashboard")
+    return dashboard.server.test_client()
+
+
+@pytest.mark.parametrize("query, status", [
+    ("format=csv&api=42-383-37763-0000", 200),
+    ("format=parquet&api=42-383-37763-0000", 200),
+    ("format=aries&api=42-135-41592-0000", 200),
+    ("format=aries&api=42-383-37763-0000", 400),
+    ("format=xml&api=42-383-37763-0000", 400),
+    ("format=csv&api=42-383-37763-0000&months=0", 400),
+])
+def test_dashboard_export_route(dashboard_client, query, status):
+    r = dashboard_client.get(f"/export/forecast?{query}")
+    assert r.status_code == status
+    if status == 200:
+        assert len(r.get_data()) > 0
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+import decline
+import fitting
+
+
+@pytest.mark.parametrize("b", [0.0, 0.6, 1.3])
+def test_fit_recovers_parameters(b):
+    t = np.arange(60.0)
+    rates = np.concatenate([[50.0, 120.0], decline.arps_rate(400.0, 0.1, b, t)[0]])
+    fit = fitting.fit_arps(rates)
+    assert fit.success
+    assert fit.t0 == 2 and fit.t_last == 61 and fit.n == 60
+    assert (fit.qi, fit.di, fit.b) == pytest.approx((400.0, 0.1, b), rel=1e-4, abs=1e-4)
+
+
+def test_missing_months_are_skipped():
+    rates = decline.arps_rate(400.0, 0.1, 0.8, np.arange(48.0))[0]
+    rates[[5, 6, 20]] = np.nan
+    rates[30] = 0.0
+    fit = fitting.fit_arps(rates)
+    assert fit.n == 44
+    assert fit.b == pytest.approx(0.8, rel=1e-4)
+
+
+def test_too_short_history_fails():
+    fit = fitting.fit_arps([100.0, 90.0])
+    assert not fit.success and fit.n == 2
+
+
+def test_history_hash_depends_on_settings():
+    rates = np.arange(10.0)
+    assert fitting.history_hash(rates) == fitting.history_hash(list(rates))
+    assert fitting.history_hash(rates) != fitting.history_hash(rates, phase="Gas")
+    assert fitting.history_hash(rates) != fitting.history_hash(rates + 1)
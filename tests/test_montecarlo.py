@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+import montecarlo
+
+SPEC = {"qi": ("lognormal", 150, 400), "di": ("lognormal", 0.1, 0.3), "b": ("uniform", 0.5, 1.2), "dmin": 0.005}
+
+
+def test_tally_percentiles_match_exact():
+    values = np.random.default_rng(0).lognormal(12, 1, 200000)
+    result = montecarlo.summarize(montecarlo.tally(values))
+    for name, q in montecarlo.PERCENTILES.items():
+        assert result.summary[name] == pytest.approx(np.percentile(values, q), rel=2e-3)
+    assert result.summary["Mean"] == pytest.approx(values.mean())
+    assert result.counts.sum() == values.size
+
+
+def test_merge_equals_one_tally():
+    values = np.random.default_rng(1).lognormal(10, 2, 5000)
+    merged = montecarlo.merge(montecarlo.tally(values[:1234]), montecarlo.tally(values[1234:]))
+    whole = montecarlo.tally(values)
+    np.testing.assert_array_equal(merged.counts, whole.counts)
+    assert (merged.n, merged.low, merged.high) == (whole.n, whole.low, whole.high)
+
+
+def test_simulation_is_reproducible_across_processes():
+    serial = montecarlo.simulate(SPEC, 50000, seed=7, chunk_size=5000, processes=1)
+    pooled = montecarlo.simulate(SPEC, 50000, seed=7, chunk_size=5000, processes=2)
+    assert serial.n == 50000
+    assert serial.summary == pooled.summary
+    np.testing.assert_array_equal(serial.counts, pooled.counts)
+    assert montecarlo.simulate(SPEC, 50000, seed=8, chunk_size=5000, processes=1).summary != serial.summary
+
+
+GOOD = {"qi": (150, 400), "Di": (0.1, 0.3), "b": (0.5, 1.2), "Dmin": (5, 8)}
+
+
+@pytest.mark.parametrize("change, n, seed", [
+    ({}, 1000, -1),
+    ({}, 1000, 1.5),
+    ({}, 0, 1),
+    ({}, None, 1),
+    ({"qi": (0, 400)}, 1000, 1),
+    ({"Di": (-0.1, 0.3)}, 1000, 1),
+    ({"b": (1.2, 0.5)}, 1000, 1),
+    ({"qi": (400, 150)}, 1000, 1),
+    ({"Dmin": (5, 100)}, 1000, 1),
+])
+def test_dashboard_rejects_bad_monte_carlo_inputs(change, n, seed):
+    dashboard = pytest.importorskip("dashboard")
+    assert dashboard.mc_input_error(dict(GOOD, **change), n, seed)
+    assert dashboard.mc_input_error(GOOD, 1000, 0) is None
@@ -0,0 +1,90 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import batch
+import columnar
+import loader
+import refit
+from test_batch import read_fits, write_wells
+
+
+def mtimes(out_dir):
+    return {n: os.stat(os.path.join(out_dir, n)).st_mtime_ns
+            for n in os.listdir(out_dir) if n.startswith(("fits-", "forecast-"))}
+
+
+def refit_parts(capsys, *args, **kwargs):
+    """Run refit and return the number of parts it reported writing."""
+    capsys.readouterr()
+    refit.run(*args, **kwargs)
+    line = capsys.readouterr().err.strip().splitlines()[-1]
+    return int(line.split("; ")[1].split()[0])
+
+
+@pytest.fixture
+def well_dir(tmp_path):
+    path = tmp_path / "wells"
+    path.mkdir()
+    write_wells(path, 5)
+    return str(path)
+
+
+@pytest.mark.parametrize("store", [False, True])
+def test_noop_refit_writes_nothing(well_dir, tmp_path, capsys, store):
+    if store:
+        source = str(tmp_path / "store")
+        columnar.build_store(loader.list_csvs(well_dir), source)
+    else:
+        source = well_dir
+    out = str(tmp_path / "out")
+    batch.run(source, out, months=12, workers=1, chunk_size=2)
+    before = mtimes(out)
+
+    assert refit_parts(capsys, source, out, months=12, workers=1) == 0
+    assert mtimes(out) == before
+
+
+def test_touched_file_rewrites_only_its_fits(well_dir, tmp_path, capsys):
+    out = str(tmp_path / "out")
+    batch.run(well_dir, out, months=12, workers=1, chunk_size=2)
+    before = mtimes(out)
+    path = os.path.join(well_dir, "99-000-00000-0000.csv")
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10 ** 9))
+
+    assert refit_parts(capsys, well_dir, out, months=12, workers=1) == 1
+    after = mtimes(out)
+    assert [n for n in after if after[n] != before[n]] == ["fits-00000.csv"]
+    # The next run finds the new stamp and skips the well again
+    assert refit_parts(capsys, well_dir, out, months=12, workers=1) == 0
+
+
+def test_new_months_refit_one_part(well_dir, tmp_path, capsys):
+    out = str(tmp_path / "out")
+    batch.run(well_dir, out, months=12, workers=1, chunk_size=2)
+    before = mtimes(out)
+    path = os.path.join(well_dir, "99-000-00003-0000.csv")
+    df = pd.read_csv(path)
+    df.loc[len(df)] = [len(df), df["Oil"].iloc[-1] * 0.98]
+    df.to_csv(path, index=False)
+
+    assert refit.run(well_dir, out, months=12, workers=1) == ["99-000-00003-0000"]
+    after = mtimes(out)
+    assert sorted(n for n in after if after.get(n) != before.get(n)) == ["fits-00001.csv", "forecast-00001.csv"]
+    fits = read_fits(out).set_index("API")
+    assert fits.loc["99-000-00003-0000", "t_last"] == len(df) - 1
+    assert len(fits) == 5
+
+
+def test_added_and_removed_wells(well_dir, tmp_path, capsys):
+    out = str(tmp_path / "out")
+    batch.run(well_dir, out, months=12, workers=1, chunk_size=2)
+    os.remove(os.path.join(well_dir, "99-000-00004-0000.csv"))
+    shutil.copy(os.path.join(well_dir, "99-000-00001-0000.csv"), os.path.join(well_dir, "99-000-00010-0000.csv"))
+
+    assert refit.run(well_dir, out, months=12, workers=1) == ["99-000-00010-0000"]
+    fits = read_fits(out)
+    assert sorted(fits["API"]) == sorted(loader.api_from_path(p) for p in loader.list_csvs(well_dir))
+    assert not fits["API"].duplicated().any()
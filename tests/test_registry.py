@@ -0,0 +1,61 @@
+import os
+
+import pandas as pd
+import pytest
+
+import loader
+import registry
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def wells():
+    frame = pd.DataFrame({
+        "API": ["42-001-00003", "42-001-00001", "30-015-00002", "42-001-00001", "05-123-00009"],
+        "Well Name": ["SMITH 1H", "ACME STATE 2", "SMITHSON 4", "duplicate", "BAKER 1"],
+        "Operator": ["Acme Oil", "Acme Oil", "Rio Energy", "x", "Smithfield LLC"],
+        "Basin": ["Permian", "Permian", "Delaware", "x", "DJ"],
+        "Phases": ["Oil Gas", "", "Gas", "", "Oil"],
+    })
+    return registry.WellRegistry(frame)
+
+
+def test_lookup_and_membership(wells):
+    assert len(wells) == 4
+    assert list(wells) == sorted(wells)
+    assert "42-001-00001" in wells and "42-001-0000" not in wells
+    assert wells.get("42-001-00003").phases == ("Oil", "Gas")
+    assert wells.get("42-001-00001").phases == loader.PHASES
+    assert wells.get("nope") is None
+
+
+def test_prefix_matches_come_before_substrings(wells):
+    names = [info.name for info in wells.search("smith")]
+    # Name prefixes in sorted order, then the operator substring match
+    assert names == ["SMITH 1H", "SMITHSON 4", "BAKER 1"]
+    assert [info.api for info in wells.search("42-001")] == ["42-001-00001", "42-001-00003"]
+    assert [info.api for info in wells.search("DELAWARE")] == ["30-015-00002"]
+    assert wells.search("zzz") == []
+
+
+def test_search_stops_at_the_limit(wells):
+    assert len(wells.search("", limit=2)) == 2
+    assert len(wells.search("acme", limit=1)) == 1
+    assert len(wells.search("1", limit=3)) == 3
+
+
+def test_options_keep_the_selection(wells):
+    options = wells.options("delaware", selected=["42-001-00003"])
+    assert [o["value"] for o in options] == ["42-001-00003", "30-015-00002"]
+    assert "Permian" in options[0]["search"]
+    assert wells.option("unknown") == {"label": "unknown", "value": "unknown"}
+
+
+def test_bundled_registry_loads(tmp_path):
+    wells = registry.load_registry(os.path.join(ROOT, "wells.csv"))
+    assert "42-383-37763-0000" in wells
+    bad = tmp_path / "bad.csv"
+    bad.write_text("API,Name\n1,x\n")
+    with pytest.raises(ValueError, match="Well Name"):
+        registry.WellRegistry.from_csv(str(bad))
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+import tables
+
+
+def rows(*values):
+    return [dict(zip(tables.COLUMNS, v)) for v in values]
+
+
+@pytest.mark.parametrize("text", [
+    "Month\tOil\tWater\tGas\n0\t1,200\t30\t400\n1\t1,100\t32\t380",
+    "0,1200,30,400\n1,1100,32,380",
+    "month;oil;gas;water\n0;1200;400;30\n1;1100;380;32",
+])
+def test_parse_paste_layouts(text):
+    df = tables.parse_paste(text)
+    assert list(df.columns) == list(tables.COLUMNS)
+    np.testing.assert_allclose(df.to_numpy(), [[0, 1200, 30, 400], [1, 1100, 32, 380]])
+
+
+def test_parse_paste_blanks_unparseable_cells():
+    df = tables.parse_paste("0\t100\t-\t5")
+    assert np.isnan(df.loc[0, "Water"]) and df.loc[0, "Gas"] == 5
+    assert tables.parse_paste("  ").empty
+
+
+@pytest.mark.parametrize("before, after, expected", [
+    (rows((0, 1), (1, 2), (2, 3)), rows((0, 1), (2, 3)), ("delete", 1)),
+    (rows((0, 1), (1, 2), (2, 3)), rows((0, 1), (1, 2)), ("delete", 2)),
+    (rows((0, 1), (1, 2)), rows((0, 1), (1, 5)), ("update", [(1, rows((1, 5))[0])])),
+    (rows((0, 1)), rows((0, 1), (1, 2), (2, 3)), ("update", [(1, rows((1, 2))[0]), (2, rows((2, 3))[0])])),
+    (rows((0, 1), (1, 2)), rows((0, 1), (1, 2)), None),
+    (None, rows((0, 1)), ("update", [(0, rows((0, 1))[0])])),
+])
+def test_diff_rows(before, after, expected):
+    assert tables.diff_rows(after, before) == expected
+
+
+def test_store_edits_pages_and_versions():
+    store = tables.TableStore()
+    store.replace("s", tables.parse_paste("0,100,1,10\n1,90,1,9\n2,80,1,8"))
+    assert store.version("s") == 1
+    store.set_rows("s", [(1, {"Month": 1, "Oil": 95}), (3, {"Month": 3, "Oil": "70"})])
+    store.delete_row("s", 0)
+    store.append_row("s")
+    df = store.get("s")
+    np.testing.assert_allclose(df["Oil"], [95, 80, 70, 0])
+    assert store.version("s") == 4 and store.n_rows("s") == 4
+
+    page = store.page("s", 1, 3)
+    assert page == [{"Month": 0.0, "Oil": 0.0, "Water": 0.0, "Gas": 0.0}]
+    # Cells left empty by an edit come back as None, not NaN
+    assert store.page("s", 0, 1)[0]["Water"] is None
+
+
+def test_store_evicts_least_recent_sessions():
+    store = tables.TableStore(max_sessions=2)
+    for session in "abc":
+        store.append_row(session)
+    assert len(store) == 2
+    assert store.get("a").empty and store.version("a") == 0
+    assert store.n_rows("c") == 1
@@ -0,0 +1,148 @@
+"""
+Type curves from many wells.
+
+    python typecurve.py WELL_DIR OUT.csv [--align first] [--phase Gas]
+
+Well histories are packed into one NaN-padded (n_wells, n_months) matrix,
+cleaned (see cleaning.py), shifted so each starts at its first production
+or peak month, and rate and
+cumulative percentile bands are computed down the well axis in a single
+sort. The P50 rate is then fit with the Arps engine.
+
+Percentiles follow the reserves convention: P10 is the high case (exceeded
+by 10% of wells), P90 the low case.
+"""
+import argparse
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+import batch
+import cleaning
+import decline
+import fitting
+
+TypeCurve = namedtuple("TypeCurve", "months rate cum count fit")
+TypeCurve.__doc__ = """\
+``rate`` and ``cum`` map "P10", "P50", "P90" and "Mean" to arrays over
+``months``; ``count`` is the number of wells contributing to each month
+and ``fit`` the Arps FitResult of the P50 rate."""
+
+BANDS = {"P10": 90.0, "P50": 50.0, "P90": 10.0}
+MIN_WELLS = 3
+
+
+def align(matrix, how="peak"):
+    """
+    Shift every row so month 0 is its first production (``"first"``) or
+    its peak (``"peak"``). Months before that are dropped.
+    """
+    if how not in ("peak", "first"):
+        raise ValueError(f"align must be 'peak' or 'first', not {how!r}")
+    if matrix.shape[1] == 0:
+        return matrix.copy()
+    producing = np.isfinite(matrix) & (matrix > 0)
+    if how == "peak":
+        start = np.argmax(np.where(producing, matrix, -np.inf), axis=1)
+    else:
+        start = np.argmax(producing, axis=1)
+    start[~producing.any(axis=1)] = matrix.shape[1]
+
+    cols = start[:, np.newaxis] + np.arange(matrix.shape[1])
+    inside = cols < matrix.shape[1]
+    shifted = np.take_along_axis(matrix, np.minimum(cols, matrix.shape[1] - 1), axis=1)
+    shifted[~inside] = np.nan
+    width = int(inside.sum(axis=1).max(initial=0))
+    return shifted[:, :width]
+
+
+def percentiles(matrix, qs):
+    """
+    Percentiles down the columns of a NaN-padded matrix, ignoring NaNs.
+
+    Equivalent to ``np.nanpercentile(matrix, qs, axis=0)`` (linear
+    interpolation) but done with one sort. Returns (len(qs), n_cols).
+    """
+    ordered = np.sort(matrix, axis=0)  # NaNs sort last
+    count = np.isfinite(matrix).sum(axis=0)
+    out = np.full((len(qs), matrix.shape[1]), np.nan)
+    has = count > 0
+    for i, q in enumerate(qs):
+        pos = q / 100.0 * (count[has] - 1)
+        lo = np.floor(pos).astype(int)
+        hi = np.minimum(lo + 1, count[has] - 1)
+        cols = np.flatnonzero(has)
+        frac = pos - lo
+        out[i, has] = ordered[lo, cols] * (1 - frac) + ordered[hi, cols] * frac
+    return out
+
+
+def build(histories, how="peak", min_wells=MIN_WELLS, clean=True, **fit_kwargs):
+    """
+    Type curve from monthly daily-rate series, one per well.
+
+    Months with fewer than ``min_wells`` producing wells are left NaN so the
+    tail is not set by a handful of long-lived wells. Shut-ins, gaps and
+    outliers are removed first unless ``clean`` is False.
+    """
+    rates = cleaning.pad(histories)
+    if clean:
+        rates = cleaning.clean(rates).rates
+    rates = align(rates, how)
+    # Cumulative volume per well; padding past a well's end stays NaN
+    cum = np.nancumsum(rates * decline.DAYS_PER_MONTH, axis=1)
+    cum[np.isnan(rates)] = np.nan
+
+    count = np.isfinite(rates).sum(axis=0)
+    thin = count < min_wells
+    rate_bands = {}
+    cum_bands = {}
+    for bands, values in ((rate_bands, rates), (cum_bands, cum)):
+        pct = percentiles(values, list(BANDS.values()))
+        for name, row in zip(BANDS, pct):
+            bands[name] = row
+        bands["Mean"] = np.nansum(values, axis=0) / np.maximum(count, 1)
+        for name in bands:
+            bands[name][thin] = np.nan
+
+    fit_kwargs.setdefault("align_peak", False)
+    fit = fitting.fit_arps(rate_bands["P50"], **fit_kwargs) if rates.size else fitting.FAILED
+    return TypeCurve(np.arange(rates.shape[1]), rate_bands, cum_bands, count, fit)
+
+
+def to_frame(curve):
+    """Type curve as a table with one row per month."""
+    df = pd.DataFrame({"Month": curve.months, "Wells": curve.count})
+    for name, values in curve.rate.items():
+        df[f"Rate {name}"] = values
+    for name, values in curve.cum.items():
+        df[f"Cum {name}"] = values
+    if curve.fit.success:
+        df["Rate Fit"] = decline.arps_rate(curve.fit.qi, curve.fit.di, curve.fit.b, curve.months)[0]
+    return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a P10/P50/P90 type curve from many wells.")
+    parser.add_argument("well_dir", help="directory of <API>.csv production files, or a columnar store")
+    parser.add_argument("out", help="CSV file for the monthly type curve")
+    parser.add_argument("--align", choices=("peak", "first"), default="peak")
+    parser.add_argument("--phase", choices=("Oil", "Gas", "Water"), default="Oil")
+    parser.add_argument("--min-wells", type=int, default=MIN_WELLS)
+    args = parser.parse_args(argv)
+
+    histories = []
+    for _, source in batch.list_wells(args.well_dir):
+        # build() cleans the whole matrix in one pass
+        rates = batch.load_well(args.well_dir, source, clean=False).phases().get(args.phase)
+        if rates is not None:
+            histories.append(rates)
+    curve = build(histories, args.align, args.min_wells)
+    to_frame(curve).to_csv(args.out, index=False)
+    fit = curve.fit
+    print(f"{len(histories)} wells; P50 fit qi={fit.qi:.1f} Di={fit.di:.4f} b={fit.b:.2f}")
+
+
+if __name__ == "__main__":
+    main()